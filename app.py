@@ -1,16 +1,28 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, render_template, jsonify, request
+import atexit
+import csv
+import io
+import math
 import os
 import json
 import threading
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 import schedule
 from services.bolivariano import BolivarianoService
 from services.brasilia import BrasiliaService
 from services.arauca_brasilia import AraucaBrasiliaService
 from services.transpurificacion import TranspurificacionService
 from config import Config
-from database import MonitoringDatabase
+from database import MonitoringDatabase, PROBE_FIELDS, UPTIME_RANGES, expand_slots
+from event_broadcaster import EventBroadcaster
+from response_cache import ResponseCache
+from timeline_buffer import TimelineBuffer
+from compression import choose_encoding, compress
+from probe_executor import ProbeExecutor
+from probe_archive import ProbeArchive
+from circuit_breaker import CircuitBreaker
+from services.http_client import check_connectivity, close_sessions
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -19,7 +31,48 @@ app.config.from_object(Config)
 app.jinja_env.filters['format_service_name'] = lambda service_name: service_name.replace('_', ' ').title()
 
 # Base de datos para almacenamiento persistente
-db = MonitoringDatabase()
+db = MonitoringDatabase(
+    Config.DATABASE_PATH,
+    cache_size_kb=Config.SQLITE_CACHE_SIZE_KB,
+    mmap_size_bytes=Config.SQLITE_MMAP_SIZE_BYTES,
+    write_batch_size=Config.DB_WRITE_BATCH_SIZE,
+    write_flush_interval=Config.DB_WRITE_FLUSH_INTERVAL_SECONDS
+)
+
+# Archivo frío: las verificaciones se copian aquí antes de la limpieza
+archive = ProbeArchive(Config.ARCHIVE_DIR)
+
+# Líneas de tiempo de las últimas 24 horas en memoria: se actualizan tras
+# cada escritura y sirven /api/timeline sin consultar SQLite
+timeline_buffer = TimelineBuffer()
+db.add_write_listener(timeline_buffer.apply)
+timeline_buffer.load(db.get_all_services_timeline_last_24h(), db.get_latest_probe_id())
+
+# Difusión en vivo de resultados a los dashboards conectados
+broadcaster = EventBroadcaster(
+    history_size=Config.SSE_HISTORY_SIZE,
+    heartbeat_seconds=Config.SSE_HEARTBEAT_SECONDS,
+    start_id=db.get_latest_probe_id()
+)
+
+def publish_probes(probes):
+    """Publica en el stream las verificaciones recién escritas"""
+    for probe in probes:
+        broadcaster.publish('probe', {
+            'id': probe['id'],
+            'service_name': probe['service_name'],
+            'timestamp': probe['timestamp'],
+            'status': probe['status'],
+            'slots': list(expand_slots(probe['slot'], probe['interval_minutes']))
+        }, probe['id'])
+
+db.add_write_listener(publish_probes)
+
+# Respuestas de la API ya serializadas, válidas mientras no cambien los datos
+response_cache = ResponseCache(
+    max_entries=Config.RESPONSE_CACHE_MAX_ENTRIES,
+    max_age_seconds=Config.RESPONSE_CACHE_MAX_AGE_SECONDS
+)
 
 # Servicios disponibles con sus intervalos de consulta (en minutos)
 services = {
@@ -37,11 +90,64 @@ service_intervals = {
     'transpurificacion': 5
 }
 
+# Familias de servicios con el mismo login (ver `shared_token_cache`); con
+# PROBE_FAMILIES_ENABLED se verifican juntas en un solo turno del pool
+service_families = {
+    'brasilia': ['brasilia', 'arauca_brasilia']
+}
+
 # Control de ejecuciones para evitar duplicados
 last_execution = {}
 
+# Pool acotado para ejecutar las verificaciones en paralelo
+probe_executor = ProbeExecutor(
+    max_workers=Config.PROBE_MAX_WORKERS,
+    deadline_seconds=Config.PROBE_DEADLINE_SECONDS
+)
+
+# Circuito por servicio: con el upstream caído se evita el login y la consulta
+circuit_breakers = {
+    service_name: CircuitBreaker(Config.CIRCUIT_FAILURE_THRESHOLD, Config.CIRCUIT_RECOVERY_PRECHECKS)
+    for service_name in services
+}
+
+def timed_check(service_name):
+    """Ejecuta la verificación midiendo su latencia (login incluido).
+    
+    Con el circuito abierto solo se comprueba la conexión con el host y el
+    turno queda como error con el motivo del circuito, sin latencia para no
+    alterar las estadísticas.
+    """
+    service = services[service_name]
+    breaker = circuit_breakers[service_name]
+    if not breaker.allow_probe():
+        reachable, error = check_connectivity(service.base_url, Config.CIRCUIT_PRECHECK_TIMEOUT_SECONDS)
+        reason = breaker.record_precheck(reachable)
+        return {
+            'status': 'error',
+            'request': '',
+            'response': '',
+            'error': reason if reachable else f'{reason}: {error}',
+            'circuit': breaker.health()
+        }
+    
+    started = time.monotonic()
+    result = service.check_service()
+    result['latency_ms'] = int((time.monotonic() - started) * 1000)
+    return result
+
+def deadline_result(elapsed):
+    """Resultado de error para una verificación que superó el plazo"""
+    return {
+        'status': 'error',
+        'request': '',
+        'response': '',
+        'error': f'Probe deadline exceeded ({elapsed:.0f}s > {probe_executor.deadline_seconds:.0f}s)',
+        'latency_ms': int(elapsed * 1000)
+    }
+
 def run_service_check(service_name, service):
-    """Ejecuta la verificación de un servicio y almacena el resultado"""
+    """Programa la verificación de un servicio en el pool y almacena el resultado al terminar"""
     now = datetime.now()
     
     # Control anti-duplicados: evitar múltiples ejecuciones en el mismo minuto
@@ -52,42 +158,98 @@ def run_service_check(service_name, service):
         print(f"[DEBUG] SALTANDO {service_name} - ya ejecutado en este minuto")
         return
     
+    submitted = probe_executor.submit(
+        service_name,
+        lambda: timed_check(service_name),
+        lambda result: store_service_result(service_name, result, now),
+        lambda elapsed: store_service_result(service_name, deadline_result(elapsed), now)
+    )
+    
+    if not submitted:
+        print(f"[DEBUG] SALTANDO {service_name} - verificación anterior aún en curso")
+        return
+    
     last_execution[service_name] = current_minute
     print(f"[DEBUG] EJECUTANDO verificación completa para {service_name}")
-    result = service.check_service()
+
+def run_family_check(family_name):
+    """Verifica en una sola pasada los servicios de una familia que estén al día.
     
-    # Crear clave para el tiempo (redondeado a 5 minutos)
-    time_key = now.replace(second=0, microsecond=0)
-    time_key = time_key.replace(minute=(time_key.minute // 5) * 5)
-    time_str = time_key.strftime('%H:%M')
+    Los servicios se ejecutan en orden dentro del mismo turno del pool: el
+    primero inicia sesión y los demás reutilizan el token compartido. El
+    plazo del pool aplica a la pasada completa.
+    """
+    now = datetime.now()
+    current_minute = now.replace(second=0, microsecond=0)
+    
+    due = []
+    for service_name in service_families[family_name]:
+        last_exec = last_execution.get(service_name)
+        # Un minuto de margen por el desfase del scheduler
+        min_seconds = (service_intervals[service_name] - 1) * 60
+        if last_exec is None or (current_minute - last_exec).total_seconds() >= min_seconds:
+            due.append(service_name)
+    if not due:
+        return
+    
+    def family_check():
+        results = {}
+        for service_name in due:
+            try:
+                results[service_name] = timed_check(service_name)
+            except Exception as e:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] {service_name.upper()}: ❌ EXCEPTION - {str(e)}")
+        return results
+    
+    def store_results(results):
+        for service_name, result in results.items():
+            store_service_result(service_name, result, now)
     
-    # Calcular cuántas barras debe pintar según el intervalo del servicio
+    def on_timeout(elapsed):
+        for service_name in due:
+            store_service_result(service_name, deadline_result(elapsed), now)
+    
+    family_key = f'{family_name}_family'
+    if not probe_executor.submit(family_key, family_check, store_results, on_timeout):
+        print(f"[DEBUG] SALTANDO familia {family_name} - pasada anterior aún en curso")
+        return
+    
+    for service_name in due:
+        last_execution[service_name] = current_minute
+    print(f"[DEBUG] EJECUTANDO familia {family_name}: {', '.join(due)}")
+
+def store_service_result(service_name, result, now):
+    """Almacena el resultado de una verificación en la base de datos"""
+    # Calcular cuántas barras cubre la verificación según el intervalo del servicio
     service_interval = service_intervals.get(service_name, 5)
     bars_to_paint = service_interval // 5  # Cada barra representa 5 minutos
     
-    # Guardar en base de datos múltiples registros para barras consecutivas
-    for i in range(bars_to_paint):
-        # Calcular time_slot para cada barra
-        current_time_key = time_key + timedelta(minutes=i * 5)
-        current_time_str = current_time_key.strftime('%H:%M')
-        
-        db.insert_monitoring_data(
-            service_name=service_name,
-            timestamp=now,
-            time_slot=current_time_str,
-            status=result['status'],
-            request_data=result.get('request', ''),
-            response_data=result.get('response', ''),
-            error_message=result.get('error', '')
-        )
+    # Los turnos con el circuito abierto ya se contaron en `record_precheck`
+    if 'circuit' not in result:
+        circuit_breakers[service_name].record_result(result['status'] == 'success', result.get('error', ''))
+    
+    # Encolar una sola fila por verificación; el segmento absoluto se deriva
+    # del timestamp y los que cubre se calculan al consultar según el intervalo
+    db.enqueue_monitoring_data(
+        service_name=service_name,
+        timestamp=now,
+        status=result['status'],
+        request_data=result.get('request', ''),
+        response_data=result.get('response', ''),
+        error_message=result.get('error', ''),
+        interval_minutes=service_interval,
+        latency_ms=result.get('latency_ms')
+    )
     
     # Mensaje más descriptivo según el resultado
+    login_status = result.get('login', {}).get('status', 'unknown')
     if result['status'] == 'success':
         bars_info = f"({bars_to_paint} barras)" if bars_to_paint > 1 else ""
-        status_msg = f"✅ COMPLETE (Login + Request OK) {bars_info}"
+        status_msg = f"✅ COMPLETE (Login {login_status} + Request OK) {bars_info}"
     else:
         error_preview = result.get('error', 'Unknown error')[:50] + '...' if len(result.get('error', '')) > 50 else result.get('error', 'Unknown error')
-        status_msg = f"❌ FAILED: {error_preview}"
+        login_info = "CIRCUIT OPEN " if 'circuit' in result else "LOGIN " if login_status == 'error' else ""
+        status_msg = f"❌ {login_info}FAILED: {error_preview}"
     
     print(f"[{now.strftime('%H:%M:%S')}] {service_name.upper()}: {status_msg}")
 
@@ -102,20 +264,58 @@ def run_individual_service_check(service_name):
 def cleanup_old_data():
     """Limpia datos antiguos de la base de datos"""
     try:
-        deleted_count = db.cleanup_old_data(hours_to_keep=24)
+        deleted_count = db.cleanup_old_data(
+            hours_to_keep=24,
+            archive=archive,
+            batch_size=Config.DB_CLEANUP_BATCH_SIZE,
+            pause_seconds=Config.DB_CLEANUP_PAUSE_SECONDS
+        )
         if deleted_count > 0:
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Limpieza: eliminados {deleted_count} registros antiguos")
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Limpieza: archivados y eliminados {deleted_count} registros antiguos")
+        
+        # Los resúmenes por hora y por día se conservan meses
+        deleted_rollups = db.cleanup_old_rollups(
+            hourly_days_to_keep=Config.ROLLUP_HOURLY_RETENTION_DAYS,
+            daily_days_to_keep=Config.ROLLUP_DAILY_RETENTION_DAYS
+        )
+        if deleted_rollups > 0:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Limpieza: eliminados {deleted_rollups} resúmenes antiguos")
+        
+        # Devolver al disco las páginas que quedaron libres
+        reclaimed_pages = db.reclaim_free_pages(
+            pages_per_step=Config.DB_VACUUM_PAGES_PER_STEP,
+            pause_seconds=Config.DB_CLEANUP_PAUSE_SECONDS
+        )
+        if reclaimed_pages > 0:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Limpieza: liberadas {reclaimed_pages} páginas")
     except Exception as e:
         print(f"Error en limpieza de datos: {str(e)}")
 
+def shutdown():
+    """Detiene las verificaciones y escribe los datos pendientes al salir"""
+    probe_executor.shutdown(wait=False)
+    db.close()
+    close_sessions()
+
+atexit.register(shutdown)
+
 def start_scheduler():
     """Inicia el scheduler en un hilo separado"""
     print("\n🚀 INICIANDO MONITOR DE SERVICIOS")
     print("=" * 50)
     
-    # Programar cada servicio con su intervalo específico
+    # Programar las familias (si están activas) y cada servicio restante con su intervalo
     print("📅 Programando servicios:")
+    families = service_families if Config.PROBE_FAMILIES_ENABLED else {}
+    family_members = {name for members in families.values() for name in members}
+    for family_name, members in families.items():
+        # La familia se revisa al ritmo del miembro más frecuente
+        interval_minutes = math.gcd(*(service_intervals[name] for name in members))
+        schedule.every(interval_minutes).minutes.do(run_family_check, family_name)
+        print(f"   • Familia {family_name.title()} ({', '.join(members)}): cada {interval_minutes} min.")
     for service_name, interval_minutes in service_intervals.items():
+        if service_name in family_members:
+            continue
         schedule.every(interval_minutes).minutes.do(run_individual_service_check, service_name)
         formatted_name = service_name.replace('_', ' ').title()
         print(f"   • {formatted_name}: cada {interval_minutes} min.")
@@ -124,11 +324,14 @@ def start_scheduler():
     schedule.every(1).hours.do(cleanup_old_data)
     print(f"   • Limpieza BD: cada 1 hora")
     
-    # Ejecutar verificaciones iniciales para todos los servicios
+    # Ejecutar verificaciones iniciales para todos los servicios (en paralelo)
     print(f"\n🔍 VERIFICACIÓN INICIAL ({len(services)} servicios):")
     print("-" * 30)
+    for family_name in families:
+        run_family_check(family_name)
     for service_name in services.keys():
-        run_individual_service_check(service_name)
+        if service_name not in family_members:
+            run_individual_service_check(service_name)
     cleanup_old_data()
     
     print("\n✅ Sistema iniciado correctamente")
@@ -137,8 +340,29 @@ def start_scheduler():
     
     while True:
         schedule.run_pending()
+        probe_executor.reap_expired()
         time.sleep(1)
 
+@app.after_request
+def compress_response(response):
+    """Comprime las respuestas JSON grandes que no salen de la caché (p. ej. /api/probe)"""
+    if (response.direct_passthrough or response.is_streamed or
+            response.status_code != 200 or
+            response.mimetype != 'application/json' or
+            'Content-Encoding' in response.headers):
+        return response
+    
+    body = response.get_data()
+    if len(body) < Config.COMPRESSION_MIN_BYTES:
+        return response
+    
+    encoding = choose_encoding(request.accept_encodings)
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
 @app.route('/')
 def index():
     """Página principal"""
@@ -154,23 +378,201 @@ def index():
                          services=sorted(services.keys()),
                          services_with_intervals=services_with_intervals)
 
+def cached_response(build):
+    """Sirve una respuesta JSON memoizada por generación de datos con ETag fuerte.
+    
+    `build` retorna (datos, cabeceras). Si el cliente envía un If-None-Match
+    que coincide con la versión actual se responde 304 sin cuerpo.
+    """
+    def serialize():
+        payload, headers = build()
+        return app.json.dumps(payload, separators=(',', ':')).encode('utf-8'), headers
+    
+    entry = response_cache.get_or_build(request.full_path, db.get_generation(), serialize)
+    
+    # Comprimir solo cuerpos grandes; la versión comprimida queda en caché
+    encoding = choose_encoding(request.accept_encodings) if len(entry.body) >= Config.COMPRESSION_MIN_BYTES else None
+    etag = entry.encoded_etag(encoding)
+    
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(entry.encoded_body(encoding), mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    response.headers.update(entry.headers)
+    return response
+
+def cursor_response(fetch, latest_id=db.get_latest_probe_id):
+    """Responde con los datos posteriores al cursor `since` y el cursor nuevo.
+    
+    El cursor es el id de la última verificación incluida; se devuelve en la
+    cabecera X-Data-Cursor para que el cliente pida solo los cambios.
+    `latest_id` indica de dónde leer el cursor actual.
+    """
+    def build():
+        since_id = request.args.get('since', type=int)
+        cursor = latest_id()
+        return fetch(since_id, cursor), {'X-Data-Cursor': str(cursor)}
+    
+    return cached_response(build)
+
 @app.route('/api/data/<service_name>')
 def get_service_data(service_name):
     """API endpoint para obtener datos de un servicio específico"""
     if service_name not in services:
         return jsonify({'error': 'Service not found'}), 404
     
-    data = db.get_service_data_last_24h(service_name)
-    return jsonify(data)
+    return cursor_response(lambda since_id, until_id: db.get_service_data_last_24h(
+        service_name, since_id=since_id, until_id=until_id))
 
 @app.route('/api/data')
 def get_all_data():
     """API endpoint para obtener datos de todos los servicios"""
-    return jsonify(db.get_all_services_data_last_24h())
+    return cursor_response(lambda since_id, until_id: db.get_all_services_data_last_24h(
+        since_id=since_id, until_id=until_id))
+
+@app.route('/api/timeline/<service_name>')
+def get_service_timeline(service_name):
+    """API endpoint con la línea de tiempo compacta de un servicio (desde memoria)"""
+    if service_name not in services:
+        return jsonify({'error': 'Service not found'}), 404
+    
+    return cursor_response(lambda since_id, until_id: timeline_buffer.get_all(
+        service_name, since_id=since_id, until_id=until_id).get(service_name, {}),
+        timeline_buffer.latest_id)
+
+@app.route('/api/timeline')
+def get_all_timelines():
+    """API endpoint con la línea de tiempo compacta de todos los servicios (desde memoria)"""
+    return cursor_response(lambda since_id, until_id: timeline_buffer.get_all(
+        since_id=since_id, until_id=until_id), timeline_buffer.latest_id)
+
+@app.route('/api/stream')
+def stream_events():
+    """Stream SSE con cada verificación nueva; admite reanudar con Last-Event-ID"""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get('last_event_id', type=int)
+    
+    return Response(
+        broadcaster.subscribe(last_event_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/probe/<int:probe_id>')
+def get_probe_detail(probe_id):
+    """API endpoint con el detalle (request/response/error) de una verificación"""
+    probe = db.get_probe(probe_id)
+    if probe is None:
+        return jsonify({'error': 'Probe not found'}), 404
+    
+    return jsonify(probe)
+
+@app.route('/api/auth')
+def get_auth_status():
+    """API endpoint para obtener el estado del login de cada servicio"""
+    return jsonify({
+        service_name: service.token_cache.health()
+        for service_name, service in services.items()
+    })
+
+@app.route('/api/circuits')
+def get_circuit_status():
+    """API endpoint con el estado del circuito de cada servicio"""
+    return jsonify({
+        service_name: breaker.health()
+        for service_name, breaker in circuit_breakers.items()
+    })
+
+@app.route('/api/uptime/<service_name>')
+def get_service_uptime(service_name):
+    """API endpoint con disponibilidad y latencia de 7, 30 o 90 días (desde los resúmenes)"""
+    if service_name not in services:
+        return jsonify({'error': 'Service not found'}), 404
+    
+    range_key = request.args.get('range', '7d')
+    if range_key not in UPTIME_RANGES:
+        return jsonify({'error': f"Invalid range, use one of: {', '.join(UPTIME_RANGES)}"}), 400
+    
+    return cached_response(lambda: (db.get_uptime(service_name, range_key), {}))
+
+@app.route('/api/archive/<service_name>')
+def get_archived_probes(service_name):
+    """API endpoint que transmite en NDJSON las verificaciones archivadas de un rango.
+    
+    `from` y `to` son epoch en milisegundos; la respuesta se genera a medida
+    que se descomprime el archivo, sin cargar días completos en memoria.
+    """
+    if service_name not in services:
+        return jsonify({'error': 'Service not found'}), 404
+    
+    start_ms = request.args.get('from', type=int)
+    end_ms = request.args.get('to', type=int)
+    if start_ms is None or end_ms is None or end_ms <= start_ms:
+        return jsonify({'error': 'from and to (epoch ms, from < to) are required'}), 400
+    
+    def generate():
+        for probe in archive.read(service_name, start_ms, end_ms):
+            yield json.dumps(probe, separators=(',', ':')) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/export')
+def export_probes():
+    """API endpoint que transmite en NDJSON o CSV las verificaciones de un rango.
+    
+    `from` y `to` son epoch en milisegundos; `service` filtra por servicio y
+    `format` es `ndjson` (por defecto) o `csv`. Las filas se leen de SQLite
+    por páginas a medida que se envían.
+    """
+    start_ms = request.args.get('from', type=int)
+    end_ms = request.args.get('to', type=int)
+    service_name = request.args.get('service')
+    export_format = request.args.get('format', 'ndjson')
+    if start_ms is None or end_ms is None or end_ms <= start_ms:
+        return jsonify({'error': 'from and to (epoch ms, from < to) are required'}), 400
+    if service_name is not None and service_name not in services:
+        return jsonify({'error': 'Service not found'}), 404
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    probes = db.export_probes(start_ms, end_ms, service_name)
+    
+    if export_format == 'csv':
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(PROBE_FIELDS)
+            for probe in probes:
+                writer.writerow([probe[field] for field in PROBE_FIELDS])
+                if buffer.tell() >= 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        mimetype = 'text/csv'
+    else:
+        def generate():
+            for probe in probes:
+                yield json.dumps(probe, separators=(',', ':')) + '\n'
+        mimetype = 'application/x-ndjson'
+    
+    filename = f"{service_name or 'monitoring'}-{start_ms}-{end_ms}.{export_format}"
+    return Response(generate(), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 @app.route('/api/stats')
 def get_database_stats():
-    """API endpoint para obtener estadísticas de la base de datos"""
+    """API endpoint para obtener estadísticas de la base de datos.
+    
+    No pasa por la caché: la cola de escritura y el tamaño del WAL cambian
+    sin que avance la generación de datos.
+    """
     return jsonify(db.get_database_stats())
 
 if __name__ == '__main__':
@@ -0,0 +1,87 @@
+import threading
+from datetime import datetime
+from typing import Any, Dict
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Corta las verificaciones completas de un servicio caído.
+
+    - closed: se ejecuta la verificación completa. Tras `failure_threshold`
+      errores seguidos el circuito se abre.
+    - open: en lugar de login + consulta se hace una comprobación barata
+      (conexión TCP/TLS) y el turno se registra como error con el motivo del
+      circuito. Tras `recovery_prechecks` comprobaciones exitosas seguidas
+      pasa a half_open.
+    - half_open: se ejecuta una verificación completa de prueba; si tiene
+      éxito el circuito se cierra y si falla vuelve a abrirse.
+
+    Con `failure_threshold` en 0 el circuito nunca se abre.
+    """
+
+    def __init__(self, failure_threshold: int = 3, recovery_prechecks: int = 2):
+        self.failure_threshold = failure_threshold
+        self.recovery_prechecks = max(1, recovery_prechecks)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._prechecks_ok = 0
+        self._last_error = ''
+        self._opened_at = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow_probe(self) -> bool:
+        """True si corresponde la verificación completa (closed o half_open)"""
+        with self._lock:
+            return self._state != OPEN
+
+    def record_result(self, success: bool, error: str = ''):
+        """Registra el resultado de una verificación completa"""
+        with self._lock:
+            if success:
+                self._state = CLOSED
+                self._failures = 0
+                self._last_error = ''
+                self._opened_at = None
+                return
+            self._failures += 1
+            self._last_error = error
+            if self._state == HALF_OPEN or (
+                    self.failure_threshold and self._failures >= self.failure_threshold):
+                self._open()
+
+    def record_precheck(self, success: bool) -> str:
+        """Registra una comprobación barata con el circuito abierto; retorna el motivo del turno"""
+        with self._lock:
+            if success:
+                self._prechecks_ok += 1
+                if self._prechecks_ok >= self.recovery_prechecks:
+                    self._state = HALF_OPEN
+            else:
+                self._prechecks_ok = 0
+            return (f'Circuit open since {self._opened_at} after {self._failures} consecutive failures '
+                    f'(last: {self._last_error}); pre-check {self._prechecks_ok}/{self.recovery_prechecks} OK')
+
+    def _open(self):
+        self._state = OPEN
+        self._prechecks_ok = 0
+        self._opened_at = datetime.now().isoformat(timespec='seconds')
+
+    def health(self) -> Dict[str, Any]:
+        """Estado del circuito"""
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'last_error': self._last_error,
+                'opened_at': self._opened_at,
+                'prechecks_ok': self._prechecks_ok,
+                'recovery_prechecks': self.recovery_prechecks
+            }
@@ -0,0 +1,49 @@
+import gzip
+from typing import List, Optional
+
+# Compresores opcionales: se usan solo si la librería está instalada
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 6
+
+
+def available_encodings() -> List[str]:
+    """Codificaciones soportadas, en orden de preferencia del servidor"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+
+def choose_encoding(accept_encodings) -> Optional[str]:
+    """Elige la codificación según la cabecera Accept-Encoding del cliente.
+
+    `accept_encodings` es el objeto `request.accept_encodings` de Werkzeug.
+    Retorna None si el cliente no acepta ninguna codificación soportada.
+    """
+    return accept_encodings.best_match(available_encodings())
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Comprime `body` con la codificación indicada"""
+    if encoding == 'gzip':
+        # mtime fijo para que el mismo cuerpo produzca siempre los mismos bytes
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'zstd' and zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    raise ValueError(f'Unsupported encoding: {encoding}')
@@ -23,6 +23,11 @@ class Config:
     ARAUCA_BRASILIA_USERNAME = os.environ.get('ARAUCA_BRASILIA_USERNAME') or 'VI_WEB12'
     ARAUCA_BRASILIA_PASSWORD = os.environ.get('ARAUCA_BRASILIA_PASSWORD') or 'P1NBU52020'
     
+    # Backend de login de cada servicio Brasilia: los servicios con el mismo
+    # backend y las mismas credenciales comparten token y cookie de sesión
+    BRASILIA_AUTH_SCOPE = os.environ.get('BRASILIA_AUTH_SCOPE') or 'BrasiliaServices'
+    ARAUCA_BRASILIA_AUTH_SCOPE = os.environ.get('ARAUCA_BRASILIA_AUTH_SCOPE') or 'BrasiliaServices'
+    
     # Configuración Transpurificación (SOAP)
     TRANSPURIFICACION_KEY = os.environ.get('TRANSPURIFICACION_KEY') or 'AABRCYAAADAABXCMF'
     TRANSPURIFICACION_CONSUMER_ID = os.environ.get('TRANSPURIFICACION_CONSUMER_ID') or 'PINB'
@@ -31,6 +36,67 @@ class Config:
     CHECK_INTERVAL_MINUTES = 5
     UPDATE_INTERVAL_SECONDS = 30
     
+    # Ejecución concurrente de verificaciones
+    PROBE_MAX_WORKERS = int(os.environ.get('PROBE_MAX_WORKERS') or 4)
+    PROBE_DEADLINE_SECONDS = float(os.environ.get('PROBE_DEADLINE_SECONDS') or 90)
+    # Verificar las familias de servicios que comparten login en una sola pasada
+    PROBE_FAMILIES_ENABLED = (os.environ.get('PROBE_FAMILIES_ENABLED') or 'false').lower() in ('1', 'true', 'yes')
+    
+    # Circuito por servicio: errores seguidos para abrirlo (0 = desactivado),
+    # comprobaciones TCP/TLS exitosas para volver a probar y su timeout
+    CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD') or 3)
+    CIRCUIT_RECOVERY_PRECHECKS = int(os.environ.get('CIRCUIT_RECOVERY_PRECHECKS') or 2)
+    CIRCUIT_PRECHECK_TIMEOUT_SECONDS = float(os.environ.get('CIRCUIT_PRECHECK_TIMEOUT_SECONDS') or 5)
+    
+    # Sesiones HTTP compartidas (pool de conexiones keep-alive)
+    HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS') or 4)
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE') or 4)
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT') or 10)
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT') or 30)
+    HTTP_TCP_KEEPALIVE_SECONDS = int(os.environ.get('HTTP_TCP_KEEPALIVE_SECONDS') or 60)
+    
+    # Evidencia guardada por verificación: bytes del JSON serializado,
+    # elementos conservados por lista y caracteres por texto largo. Cada
+    # servicio puede ajustarlos con `<SERVICIO>_EVIDENCE_MAX_BYTES`, etc.
+    EVIDENCE_MAX_BYTES = int(os.environ.get('EVIDENCE_MAX_BYTES') or 32768)
+    EVIDENCE_MAX_ITEMS = int(os.environ.get('EVIDENCE_MAX_ITEMS') or 3)
+    EVIDENCE_MAX_STRING_CHARS = int(os.environ.get('EVIDENCE_MAX_STRING_CHARS') or 16384)
+    
+    # Caché de tokens (TTL usado cuando el token no es un JWT con `exp`)
+    TOKEN_TTL_SECONDS = float(os.environ.get('TOKEN_TTL_SECONDS') or 1800)
+    TOKEN_REFRESH_MARGIN_SECONDS = float(os.environ.get('TOKEN_REFRESH_MARGIN_SECONDS') or 60)
+    
+    # Base de datos SQLite
+    DATABASE_PATH = os.environ.get('DATABASE_PATH') or 'monitoring.db'
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB') or 8192)
+    SQLITE_MMAP_SIZE_BYTES = int(os.environ.get('SQLITE_MMAP_SIZE_BYTES') or 64 * 1024 * 1024)
+    DB_WRITE_BATCH_SIZE = int(os.environ.get('DB_WRITE_BATCH_SIZE') or 100)
+    DB_WRITE_FLUSH_INTERVAL_SECONDS = float(os.environ.get('DB_WRITE_FLUSH_INTERVAL_SECONDS') or 1.0)
+    
+    # Stream de eventos (Server-Sent Events)
+    SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS') or 15)
+    SSE_HISTORY_SIZE = int(os.environ.get('SSE_HISTORY_SIZE') or 1000)
+    
+    # Caché de respuestas de la API
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES') or 256)
+    RESPONSE_CACHE_MAX_AGE_SECONDS = float(os.environ.get('RESPONSE_CACHE_MAX_AGE_SECONDS') or 60)
+    
+    # Compresión de respuestas (gzip; brotli/zstd si están instalados)
+    COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES') or 1024)
+    
+    # Limpieza incremental: filas por lote, pausa entre lotes y páginas
+    # devueltas al disco por paso de incremental_vacuum
+    DB_CLEANUP_BATCH_SIZE = int(os.environ.get('DB_CLEANUP_BATCH_SIZE') or 200)
+    DB_CLEANUP_PAUSE_SECONDS = float(os.environ.get('DB_CLEANUP_PAUSE_SECONDS') or 0.01)
+    DB_VACUUM_PAGES_PER_STEP = int(os.environ.get('DB_VACUUM_PAGES_PER_STEP') or 128)
+    
+    # Directorio del archivo frío de verificaciones (NDJSON comprimido por día)
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR') or 'archive'
+    
+    # Retención de los resúmenes de disponibilidad y latencia (días)
+    ROLLUP_HOURLY_RETENTION_DAYS = int(os.environ.get('ROLLUP_HOURLY_RETENTION_DAYS') or 90)
+    ROLLUP_DAILY_RETENTION_DAYS = int(os.environ.get('ROLLUP_DAILY_RETENTION_DAYS') or 400)
+    
     @staticmethod
     def get_service_config(service_name):
         """Obtiene la configuración de un servicio específico"""
@@ -42,16 +108,29 @@ class Config:
         elif service_name.lower() == 'brasilia':
             return {
                 'username': Config.BRASILIA_USERNAME,
-                'password': Config.BRASILIA_PASSWORD
+                'password': Config.BRASILIA_PASSWORD,
+                'auth_scope': Config.BRASILIA_AUTH_SCOPE
             }
         elif service_name.lower() == 'arauca_brasilia':
             return {
                 'username': Config.ARAUCA_BRASILIA_USERNAME,
-                'password': Config.ARAUCA_BRASILIA_PASSWORD
+                'password': Config.ARAUCA_BRASILIA_PASSWORD,
+                'auth_scope': Config.ARAUCA_BRASILIA_AUTH_SCOPE
             }
         elif service_name.lower() == 'transpurificacion':
             return {
                 'key': Config.TRANSPURIFICACION_KEY,
                 'consumer_id': Config.TRANSPURIFICACION_CONSUMER_ID
             }
-        return {} 
\ No newline at end of file
+        return {}
+    
+    @staticmethod
+    def get_evidence_config(service_name):
+        """Límites de evidencia de un servicio (argumentos de `EvidencePolicy`)"""
+        prefix = service_name.upper()
+        return {
+            'max_bytes': int(os.environ.get(f'{prefix}_EVIDENCE_MAX_BYTES') or Config.EVIDENCE_MAX_BYTES),
+            'max_items': int(os.environ.get(f'{prefix}_EVIDENCE_MAX_ITEMS') or Config.EVIDENCE_MAX_ITEMS),
+            'max_string_chars': int(os.environ.get(f'{prefix}_EVIDENCE_MAX_STRING_CHARS')
+                                    or Config.EVIDENCE_MAX_STRING_CHARS)
+        } 
\ No newline at end of file
@@ -1,195 +1,1355 @@
 import sqlite3
+import math
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import json
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from payload_codec import decode_payload, encode_payload, payload_hash
+
+# Duración de cada segmento de la línea de tiempo
+SLOT_MINUTES = 5
+SLOT_MS = SLOT_MINUTES * 60 * 1000
+
+# Payloads de una verificación: el texto se guarda una vez por hash en
+# payload_blobs y `payload_text` (registrada en cada conexión) lo descomprime
+PAYLOAD_COLUMNS = '''payload_text(rq.codec, rq.data) AS request_data,
+                       payload_text(rs.codec, rs.data) AS response_data,
+                       p.error_message'''
+
+def payload_join(probe_id_column: str) -> str:
+    """JOIN de los payloads de la verificación `probe_id_column` (para PAYLOAD_COLUMNS)"""
+    return f'''LEFT JOIN probe_payloads p ON p.probe_id = {probe_id_column}
+                LEFT JOIN payload_blobs rq ON rq.hash = p.request_hash
+                LEFT JOIN payload_blobs rs ON rs.hash = p.response_hash'''
+
+# Campos de una verificación completa al exportarla o importarla
+PROBE_FIELDS = ('id', 'service_name', 'timestamp', 'slot', 'status', 'interval_minutes',
+                'latency_ms', 'request', 'response', 'error')
+
+# Valor de PRAGMA auto_vacuum para el modo INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Tablas de resumen de disponibilidad y latencia, con el tamaño de su bucket
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+ROLLUP_TABLES = {
+    'rollup_hourly': HOUR_MS,
+    'rollup_daily': DAY_MS,
+}
+
+# Rangos de /api/uptime: tabla de resumen que los responde y cantidad de días
+UPTIME_RANGES = {
+    '7d': ('rollup_hourly', 7),
+    '30d': ('rollup_daily', 30),
+    '90d': ('rollup_daily', 90),
+}
+
+def to_epoch_ms(value) -> int:
+    """Convierte un datetime (hora local), un texto ISO 8601 o un epoch en milisegundos a epoch en milisegundos"""
+    if isinstance(value, str) and not value.isdigit():
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    return int(value)
+
+def slot_for(timestamp_ms: int) -> int:
+    """Número absoluto del segmento de 5 minutos que contiene el instante (epoch // 300 s)"""
+    return timestamp_ms // SLOT_MS
+
+def expand_slots(slot: int, interval_minutes: int) -> range:
+    """Retorna los segmentos absolutos cubiertos por una verificación.
+    
+    Una verificación cada 10 minutos en el segmento N cubre los segmentos
+    N y N + 1.
+    """
+    return range(slot, slot + max(1, (interval_minutes or SLOT_MINUTES) // SLOT_MINUTES))
+
+def latest_per_slot_sql(where: str) -> str:
+    """CTE `latest` con una sola verificación (la más reciente) por servicio y segmento.
+    
+    Primero se agrupa por segmento inicial: con el índice
+    (service_name, slot, timestamp) SQLite resuelve `MAX(timestamp)` sin leer
+    la tabla, y las columnas sueltas (id, status, intervalo) salen de la fila
+    con ese máximo. Luego cada sobreviviente se expande a los segmentos que
+    cubre según su intervalo y se vuelve a agrupar por segmento, de modo que
+    si dos verificaciones se solapan gana la más reciente. A Python llega una
+    fila por segmento. `where` filtra las filas de monitoring_data.
+    """
+    return f'''
+        WITH RECURSIVE per_slot AS (
+            SELECT id, service_name, slot, MAX(timestamp) AS timestamp, status,
+                   MAX(1, interval_minutes / {SLOT_MINUTES}) AS span
+            FROM monitoring_data INDEXED BY idx_service_slot_timestamp
+            WHERE {where}
+            GROUP BY service_name, slot
+        ),
+        offsets(n) AS (
+            SELECT 0
+            UNION ALL
+            SELECT n + 1 FROM offsets WHERE n + 1 < (SELECT MAX(span) FROM per_slot)
+        ),
+        latest AS (
+            SELECT p.id, p.service_name, p.slot + o.n AS covered_slot,
+                   MAX(p.timestamp) AS timestamp, p.status
+            FROM per_slot p
+            JOIN offsets o ON o.n < p.span
+            GROUP BY p.service_name, covered_slot
+        )
+    '''
+
+def percentile(values: List[int], fraction: float) -> Optional[int]:
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not values:
+        return None
+    rank = max(1, math.ceil(len(values) * fraction))
+    return values[rank - 1]
+
+def cursor_filter(column: str, since_id: Optional[int] = None,
+                  until_id: Optional[int] = None) -> Tuple[str, List[int]]:
+    """Condiciones SQL para limitar una consulta a ids en (since_id, until_id]"""
+    clauses = []
+    params = []
+    if since_id is not None:
+        clauses.append(f' AND {column} > ?')
+        params.append(since_id)
+    if until_id is not None:
+        clauses.append(f' AND {column} <= ?')
+        params.append(until_id)
+    return ''.join(clauses), params
+
+class ConnectionManager:
+    """Gestiona las conexiones SQLite de la aplicación.
+
+    Mantiene una única conexión de escritura protegida por un lock y un pool
+    de conexiones de lectura: cada hilo toma su propia conexión mientras lee,
+    de modo que los servidores que crean un hilo por petición reutilizan
+    conexiones en vez de abrir una nueva cada vez. Con WAL activado los
+    lectores no bloquean al escritor ni viceversa.
+    """
+    
+    def __init__(self, db_path: str, cache_size_kb: int = 8192,
+                 mmap_size_bytes: int = 64 * 1024 * 1024, busy_timeout_ms: int = 5000,
+                 max_idle_readers: int = 8):
+        self.db_path = db_path
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size_bytes = mmap_size_bytes
+        self.busy_timeout_ms = busy_timeout_ms
+        self._write_lock = threading.RLock()
+        self._writer = None
+        self._idle_readers = queue.LifoQueue(maxsize=max_idle_readers)
+        self._closed = False
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Abre una conexión con los pragmas de rendimiento aplicados"""
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA cache_size = {-int(self.cache_size_kb)}')
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size_bytes)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        # Los borrados de INSERT OR REPLACE también disparan los triggers
+        conn.execute('PRAGMA recursive_triggers = ON')
+        conn.create_function('payload_text', 2, decode_payload, deterministic=True)
+        return conn
+    
+    def _get_writer(self) -> sqlite3.Connection:
+        if self._writer is None:
+            if self._closed:
+                raise sqlite3.ProgrammingError('Database connection manager is closed')
+            self._writer = self._connect()
+            # Solo tiene efecto en archivos nuevos; los existentes se convierten
+            # en MonitoringDatabase.init_database
+            self._writer.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            # WAL es persistente en el archivo; basta con activarlo desde el escritor
+            self._writer.execute('PRAGMA journal_mode = WAL')
+        return self._writer
+    
+    @contextmanager
+    def writer(self):
+        """Conexión de escritura exclusiva; confirma o revierte al salir"""
+        with self._write_lock:
+            conn = self._get_writer()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
+    @contextmanager
+    def reader(self):
+        """Conexión de lectura de uso exclusivo del hilo actual mientras dure el bloque"""
+        # Asegurar que el archivo ya esté en modo WAL antes del primer lector
+        if self._writer is None:
+            with self._write_lock:
+                self._get_writer()
+        try:
+            conn = self._idle_readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            # Cerrar la transacción de lectura implícita antes de devolverla
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                conn.close()
+            else:
+                try:
+                    self._idle_readers.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+    
+    def close(self):
+        """Cierra todas las conexiones abiertas"""
+        self._closed = True
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._idle_readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+class WriteBehindQueue:
+    """Cola de escrituras asíncrona con commit agrupado.
+
+    Los hilos productores encolan filas sin bloquearse y un único hilo
+    escritor las confirma en lotes (una transacción por lote) cuando se
+    alcanza `batch_size` filas o han pasado `flush_interval` segundos desde
+    la primera fila pendiente.
+    
+    Si la base está bloqueada (`sqlite3.OperationalError`, p. ej. durante un
+    VACUUM o un respaldo externo) el lote se reintenta `retry_attempts`
+    veces con espera creciente y, si sigue fallando, se conserva para el
+    siguiente ciclo. Solo se descartan filas con otros errores, al superar
+    `max_pending_rows` retenidas o al cerrar; se cuentan en `dropped`.
+    """
+    
+    def __init__(self, write_batch: Callable[[List[Tuple]], None],
+                 batch_size: int = 100, flush_interval: float = 1.0,
+                 retry_attempts: int = 3, retry_backoff: float = 0.1,
+                 max_pending_rows: Optional[int] = None):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_attempts = retry_attempts
+        self.retry_backoff = retry_backoff
+        self.max_pending_rows = max_pending_rows or batch_size * 10
+        self.dropped = 0
+        self._held = 0
+        self._queue = queue.Queue()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+    
+    def put(self, row: Tuple):
+        """Encola una fila para escritura diferida"""
+        if self._stopped:
+            raise RuntimeError('Write queue is closed')
+        self._queue.put(row)
+    
+    def depth(self) -> int:
+        """Cantidad aproximada de filas pendientes de escribir (incluye las retenidas)"""
+        return self._queue.qsize() + self._held
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Escribe todo lo pendiente y espera a que quede confirmado"""
+        if not self._thread.is_alive():
+            return self.depth() == 0
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+    
+    def close(self, timeout: Optional[float] = None):
+        """Escribe lo pendiente y detiene el hilo escritor"""
+        if self._stopped:
+            return
+        self._stopped = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+    
+    def _run(self):
+        batch = []
+        waiters = []
+        deadline = None
+        stop = False
+        
+        while not stop:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # Venció el intervalo de escritura
+            
+            if item is None:
+                stop = True
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not False:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+            elif not batch:
+                deadline = None
+                continue
+            
+            if batch:
+                batch = self._write(batch)
+                if batch and stop:
+                    print(f"Descartando {len(batch)} registros sin escribir al cerrar")
+                    self.dropped += len(batch)
+                    batch = []
+                self._held = len(batch)
+            # Las filas retenidas se reintentan en el siguiente ciclo
+            deadline = time.monotonic() + self.flush_interval if batch else None
+            for waiter in waiters:
+                waiter.set()
+            waiters = []
+    
+    def _write(self, batch: List[Tuple]) -> List[Tuple]:
+        """Escribe un lote con reintentos; retorna las filas que quedan retenidas"""
+        for attempt in range(self.retry_attempts + 1):
+            try:
+                self.write_batch(batch)
+                return []
+            except sqlite3.OperationalError as e:
+                error = e
+                if attempt < self.retry_attempts:
+                    time.sleep(self.retry_backoff * 2 ** attempt)
+            except Exception as e:
+                print(f"Error escribiendo lote de {len(batch)} registros: {e}")
+                self.dropped += len(batch)
+                return []
+        
+        print(f"Error escribiendo lote de {len(batch)} registros, se reintentará: {error}")
+        excess = len(batch) - self.max_pending_rows
+        if excess > 0:
+            # Conservar las más recientes
+            print(f"Descartando {excess} registros retenidos")
+            self.dropped += excess
+            batch = batch[excess:]
+        return batch
 
 class MonitoringDatabase:
-    def __init__(self, db_path: str = 'monitoring.db'):
+    def __init__(self, db_path: str = 'monitoring.db', cache_size_kb: int = 8192,
+                 mmap_size_bytes: int = 64 * 1024 * 1024, write_batch_size: int = 100,
+                 write_flush_interval: float = 1.0):
         """Inicializa la conexión a la base de datos"""
         self.db_path = db_path
+        self.connections = ConnectionManager(db_path, cache_size_kb=cache_size_kb,
+                                             mmap_size_bytes=mmap_size_bytes)
         self.init_database()
+        self.write_listeners: List[Callable[[List[Dict]], None]] = []
+        # Generación de datos: aumenta con cada escritura o limpieza confirmada
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+        self.write_queue = WriteBehindQueue(self.insert_monitoring_batch,
+                                            batch_size=write_batch_size,
+                                            flush_interval=write_flush_interval)
+    
+    def close(self):
+        """Escribe los datos pendientes y cierra las conexiones a la base de datos"""
+        self.write_queue.close()
+        self.connections.close()
     
     def init_database(self):
-        """Crea las tablas si no existen"""
-        with sqlite3.connect(self.db_path) as conn:
+        """Crea las tablas si no existen y migra las bases de datos anteriores"""
+        with self.connections.writer() as conn:
+            # Migración: archivos creados sin auto_vacuum incremental. Cambiar
+            # el modo en un archivo existente requiere un VACUUM completo (una vez)
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+                conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                conn.execute('VACUUM')
+            
+            # Columnas de estado (calientes): lo que leen las líneas de tiempo.
+            # timestamp es epoch en milisegundos y slot el segmento absoluto de 5 minutos
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS monitoring_data (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     service_name TEXT NOT NULL,
-                    timestamp DATETIME NOT NULL,
-                    time_slot TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    slot INTEGER NOT NULL,
                     status TEXT NOT NULL,
-                    request_data TEXT,
-                    response_data TEXT,
-                    error_message TEXT,
+                    interval_minutes INTEGER NOT NULL DEFAULT 5,
+                    latency_ms INTEGER,
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(service_name, time_slot, timestamp)
+                    UNIQUE(service_name, slot, timestamp)
+                )
+            ''')
+            
+            # Contenido de los payloads, comprimido y guardado una sola vez por
+            # hash SHA-256: las verificaciones consecutivas suelen repetirlo
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS payload_blobs (
+                    hash BLOB PRIMARY KEY,
+                    codec INTEGER NOT NULL,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    refs INTEGER NOT NULL DEFAULT 0
                 )
             ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_payload_blobs_orphans
+                ON payload_blobs(hash) WHERE refs <= 0
+            ''')
+            
+            # Migración: payloads guardados como texto en probe_payloads
+            payload_columns = [row['name'] for row in conn.execute('PRAGMA table_info(probe_payloads)')]
+            if 'request_data' in payload_columns:
+                conn.execute('DROP TRIGGER IF EXISTS trg_monitoring_data_delete_payload')
+                conn.execute('ALTER TABLE probe_payloads RENAME TO probe_payloads_legacy')
             
-            # Crear índices para mejorar rendimiento
+            # Payloads (fríos): hashes de request/response y error por verificación
             conn.execute('''
-                CREATE INDEX IF NOT EXISTS idx_service_timestamp 
-                ON monitoring_data(service_name, timestamp)
+                CREATE TABLE IF NOT EXISTS probe_payloads (
+                    probe_id INTEGER PRIMARY KEY,
+                    request_hash BLOB,
+                    response_hash BLOB,
+                    error_message TEXT
+                )
+            ''')
+            
+            # Referencias por blob; los que quedan sin referencias se borran
+            # en la limpieza (no aquí: INSERT OR REPLACE borra antes de insertar)
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_probe_payloads_insert_refs
+                AFTER INSERT ON probe_payloads
+                BEGIN
+                    UPDATE payload_blobs SET refs = refs + 1 WHERE hash = NEW.request_hash;
+                    UPDATE payload_blobs SET refs = refs + 1 WHERE hash = NEW.response_hash;
+                END
+            ''')
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_probe_payloads_delete_refs
+                AFTER DELETE ON probe_payloads
+                BEGIN
+                    UPDATE payload_blobs SET refs = refs - 1 WHERE hash = OLD.request_hash;
+                    UPDATE payload_blobs SET refs = refs - 1 WHERE hash = OLD.response_hash;
+                END
+            ''')
+            
+            if 'request_data' in payload_columns:
+                self._copy_legacy_payloads(conn, 'SELECT probe_id, request_data, response_data, '
+                                                 'error_message FROM probe_payloads_legacy')
+                conn.execute('DROP TABLE probe_payloads_legacy')
+            
+            # Migración: bases de datos creadas antes de guardar una fila por verificación
+            columns = [row['name'] for row in conn.execute('PRAGMA table_info(monitoring_data)')]
+            if 'interval_minutes' not in columns:
+                conn.execute('''
+                    ALTER TABLE monitoring_data 
+                    ADD COLUMN interval_minutes INTEGER NOT NULL DEFAULT 5
+                ''')
+            
+            # Migración: mover los payloads que vivían en monitoring_data
+            if 'request_data' in columns:
+                self._copy_legacy_payloads(conn, 'SELECT id, request_data, response_data, '
+                                                 'error_message FROM monitoring_data')
+                for column in ('request_data', 'response_data', 'error_message'):
+                    conn.execute(f'ALTER TABLE monitoring_data DROP COLUMN {column}')
+            
+            # Migración: timestamps DATETIME y time_slot 'HH:MM' a enteros
+            if 'time_slot' in columns:
+                self._migrate_to_epoch_timestamps(conn)
+                columns = [row['name'] for row in conn.execute('PRAGMA table_info(monitoring_data)')]
+            
+            # Migración: latencia de cada verificación
+            if 'latency_ms' not in columns:
+                conn.execute('ALTER TABLE monitoring_data ADD COLUMN latency_ms INTEGER')
+            
+            # Resúmenes por hora y por día; se conservan meses después de
+            # que se eliminan las verificaciones individuales
+            for table in ROLLUP_TABLES:
+                conn.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        service_name TEXT NOT NULL,
+                        bucket_start INTEGER NOT NULL,
+                        success_count INTEGER NOT NULL,
+                        failure_count INTEGER NOT NULL,
+                        latency_count INTEGER NOT NULL,
+                        latency_sum_ms INTEGER NOT NULL,
+                        latency_min_ms INTEGER,
+                        latency_p95_ms INTEGER,
+                        PRIMARY KEY (service_name, bucket_start)
+                    ) WITHOUT ROWID
+                ''')
+            
+            # Valores internos de mantenimiento (p. ej. el corte de la última limpieza)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS db_metadata (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER
+                )
+            ''')
+            
+            # Migración: calcular los resúmenes de las verificaciones existentes
+            if conn.execute('SELECT 1 FROM rollup_hourly LIMIT 1').fetchone() is None:
+                self._refresh_rollups(conn, conn.execute(
+                    'SELECT service_name, timestamp, status, latency_ms FROM monitoring_data').fetchall())
+            elif self._raw_cutoff_ms(conn) == 0:
+                # Bases anteriores al registro del corte: lo previo a la
+                # verificación más antigua ya no está completo en crudo
+                oldest = conn.execute('SELECT MIN(timestamp) FROM monitoring_data').fetchone()[0]
+                self._set_raw_cutoff_ms(conn, oldest if oldest is not None else to_epoch_ms(datetime.now()))
+            
+            # Borrar el payload junto con su verificación (incluye INSERT OR REPLACE)
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_monitoring_data_delete_payload
+                AFTER DELETE ON monitoring_data
+                BEGIN
+                    DELETE FROM probe_payloads WHERE probe_id = OLD.id;
+                END
+            ''')
+            
+            # Contadores por servicio mantenidos por triggers: las estadísticas
+            # se leen en O(servicios) sin recorrer monitoring_data
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS service_stats (
+                    service_name TEXT PRIMARY KEY,
+                    total_records INTEGER NOT NULL,
+                    oldest_timestamp INTEGER,
+                    newest_timestamp INTEGER
+                )
+            ''')
+            
+            if conn.execute('SELECT 1 FROM service_stats LIMIT 1').fetchone() is None:
+                conn.execute('''
+                    INSERT INTO service_stats (service_name, total_records, oldest_timestamp, newest_timestamp)
+                    SELECT service_name, COUNT(*), MIN(timestamp), MAX(timestamp)
+                    FROM monitoring_data
+                    GROUP BY service_name
+                ''')
+            
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_monitoring_data_insert_stats
+                AFTER INSERT ON monitoring_data
+                BEGIN
+                    INSERT INTO service_stats (service_name, total_records, oldest_timestamp, newest_timestamp)
+                    VALUES (NEW.service_name, 1, NEW.timestamp, NEW.timestamp)
+                    ON CONFLICT(service_name) DO UPDATE SET
+                        total_records = total_records + 1,
+                        oldest_timestamp = MIN(oldest_timestamp, excluded.oldest_timestamp),
+                        newest_timestamp = MAX(newest_timestamp, excluded.newest_timestamp);
+                END
+            ''')
+            
+            # Al borrar el extremo más antiguo o más reciente se busca el
+            # siguiente por el índice (slot crece con timestamp), sin recorrer
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_monitoring_data_delete_stats
+                AFTER DELETE ON monitoring_data
+                BEGIN
+                    UPDATE service_stats SET
+                        total_records = total_records - 1,
+                        oldest_timestamp = CASE WHEN OLD.timestamp <= oldest_timestamp THEN (
+                            SELECT timestamp FROM monitoring_data
+                            WHERE service_name = OLD.service_name
+                            ORDER BY slot, timestamp LIMIT 1
+                        ) ELSE oldest_timestamp END,
+                        newest_timestamp = CASE WHEN OLD.timestamp >= newest_timestamp THEN (
+                            SELECT timestamp FROM monitoring_data
+                            WHERE service_name = OLD.service_name
+                            ORDER BY slot DESC, timestamp DESC LIMIT 1
+                        ) ELSE newest_timestamp END
+                    WHERE service_name = OLD.service_name;
+                    DELETE FROM service_stats
+                    WHERE service_name = OLD.service_name AND total_records <= 0;
+                END
+            ''')
+            
+            # Índice de cobertura ordenado por segmento: la deduplicación por
+            # segmento se resuelve recorriéndolo, sin leer la tabla ni ordenar
+            conn.execute('DROP INDEX IF EXISTS idx_service_timestamp')
+            conn.execute('DROP INDEX IF EXISTS idx_service_timestamp_status')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_service_slot_timestamp 
+                ON monitoring_data(service_name, slot, timestamp, status, interval_minutes)
             ''')
             
             conn.execute('''
                 CREATE INDEX IF NOT EXISTS idx_timestamp 
                 ON monitoring_data(timestamp)
             ''')
-            
-            conn.commit()
     
-    def insert_monitoring_data(self, service_name: str, timestamp: datetime, 
-                              time_slot: str, status: str, request_data: str = '', 
-                              response_data: str = '', error_message: str = ''):
-        """Inserta o actualiza datos de monitoreo"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute('''
+    def _migrate_to_epoch_timestamps(self, conn: sqlite3.Connection):
+        """Reconstruye monitoring_data con timestamp en epoch ms y slot absoluto.
+        
+        Los timestamps antiguos son textos en hora local ('YYYY-MM-DD HH:MM:SS');
+        el modificador 'utc' de SQLite los convierte a UTC antes de pasarlos a
+        epoch. Las copias por barra de versiones anteriores (mismo timestamp)
+        se fusionan en una sola fila que cubre todos sus segmentos.
+        """
+        conn.execute('DROP TRIGGER IF EXISTS trg_monitoring_data_delete_payload')
+        conn.execute('''
+            CREATE TABLE monitoring_data_v2 (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                service_name TEXT NOT NULL,
+                timestamp INTEGER NOT NULL,
+                slot INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                interval_minutes INTEGER NOT NULL DEFAULT 5,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(service_name, slot, timestamp)
+            )
+        ''')
+        conn.execute(f'''
+            INSERT INTO monitoring_data_v2 (id, service_name, timestamp, slot, status, interval_minutes, created_at)
+            SELECT MIN(id), service_name, timestamp_ms, timestamp_ms / {SLOT_MS}, status,
+                   MAX(MAX(interval_minutes), COUNT(*) * {SLOT_MINUTES}), MIN(created_at)
+            FROM (
+                SELECT id, service_name, status, interval_minutes, created_at,
+                       CAST(ROUND((julianday(timestamp, 'utc') - 2440587.5) * 86400000) AS INTEGER) AS timestamp_ms
+                FROM monitoring_data
+                WHERE julianday(timestamp) IS NOT NULL
+            )
+            GROUP BY service_name, timestamp_ms
+        ''')
+        conn.execute('DROP TABLE monitoring_data')
+        conn.execute('ALTER TABLE monitoring_data_v2 RENAME TO monitoring_data')
+        conn.execute('''
+            DELETE FROM probe_payloads
+            WHERE probe_id NOT IN (SELECT id FROM monitoring_data)
+        ''')
+    
+    def _copy_legacy_payloads(self, conn: sqlite3.Connection, query: str, chunk_size: int = 1000):
+        """Pasa a payload_blobs los payloads en texto de versiones anteriores.
+        
+        `query` retorna (probe_id, request, response, error); se recorre por
+        bloques para no cargar todos los payloads en memoria.
+        """
+        cursor = conn.execute(query)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            hashes = self._store_blobs(conn, [text for row in rows for text in (row[1], row[2])])
+            conn.executemany('''
+                INSERT OR REPLACE INTO probe_payloads (probe_id, request_hash, response_hash, error_message)
+                VALUES (?, ?, ?, ?)
+            ''', [(row[0], hashes[row[1]], hashes[row[2]], row[3]) for row in rows])
+    
+    def _store_blobs(self, conn: sqlite3.Connection, texts: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        """Guarda los payloads que aún no existen y retorna el hash de cada texto.
+        
+        Solo se comprime el contenido nuevo: un payload repetido cuesta un
+        hash y una búsqueda por clave primaria.
+        """
+        hashes = {}
+        for text in texts:
+            if text not in hashes:
+                hashes[text] = payload_hash(text)
+        
+        missing = {digest: text for text, digest in hashes.items() if digest is not None}
+        digests = list(missing)
+        for start in range(0, len(digests), 500):
+            chunk = digests[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for row in conn.execute(f'SELECT hash FROM payload_blobs WHERE hash IN ({placeholders})', chunk):
+                del missing[row[0]]
+        
+        if missing:
+            conn.executemany('''
+                INSERT INTO payload_blobs (hash, codec, data, size) VALUES (?, ?, ?, ?)
+            ''', [(digest, *encode_payload(text)) for digest, text in missing.items()])
+        
+        return hashes
+    
+    def _build_row(self, service_name: str, timestamp, status: str, request_data: str,
+                   response_data: str, error_message: str, interval_minutes: int,
+                   slot: Optional[int], latency_ms: Optional[int]) -> Tuple:
+        timestamp_ms = to_epoch_ms(timestamp)
+        if slot is None:
+            slot = slot_for(timestamp_ms)
+        return (service_name, timestamp_ms, slot, status, request_data,
+                response_data, error_message, interval_minutes, latency_ms)
+    
+    def insert_monitoring_data(self, service_name: str, timestamp, status: str,
+                              request_data: str = '', response_data: str = '',
+                              error_message: str = '', interval_minutes: int = SLOT_MINUTES,
+                              slot: Optional[int] = None, latency_ms: Optional[int] = None):
+        """Inserta o actualiza datos de monitoreo.
+        
+        `timestamp` es un datetime en hora local o un epoch en milisegundos.
+        Cada verificación se guarda una sola vez; `interval_minutes` indica
+        cuántos segmentos cubre a partir de `slot` (por defecto, el segmento
+        que contiene a `timestamp`). `latency_ms` es la duración de la
+        verificación, si se midió.
+        """
+        self.insert_monitoring_batch([self._build_row(service_name, timestamp, status, request_data,
+                                                      response_data, error_message,
+                                                      interval_minutes, slot, latency_ms)])
+    
+    def insert_monitoring_batch(self, rows: List[Tuple]):
+        """Inserta un lote de registros en una sola transacción.
+        
+        Cada fila es una tupla (service_name, timestamp_ms, slot, status,
+        request_data, response_data, error_message, interval_minutes,
+        latency_ms). Los resúmenes por hora y por día de los buckets tocados
+        se recalculan en la misma transacción. Tras confirmar el lote se
+        notifica a los `write_listeners`.
+        """
+        written = []
+        with self.connections.writer() as conn:
+            previous_id = conn.execute('SELECT MAX(id) AS max_id FROM monitoring_data').fetchone()['max_id'] or 0
+            
+            # Verificaciones anteriores al corte de la limpieza que ya estaban
+            # guardadas (reimportación): sus resúmenes ya las cuentan
+            raw_cutoff_ms = self._raw_cutoff_ms(conn)
+            existing = {(row[0], row[1]) for row in rows
+                        if row[1] - row[1] % HOUR_MS < raw_cutoff_ms and conn.execute(
+                            'SELECT 1 FROM monitoring_data WHERE service_name = ? AND slot = ? AND timestamp = ?',
+                            (row[0], row[2], row[1])).fetchone()}
+            
+            conn.executemany('''
                 INSERT OR REPLACE INTO monitoring_data 
-                (service_name, timestamp, time_slot, status, request_data, response_data, error_message)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (service_name, timestamp, time_slot, status, request_data, response_data, error_message))
-            conn.commit()
-    
-    def get_service_data_last_24h(self, service_name: str) -> Dict[str, Dict]:
-        """Obtiene datos de un servicio de las últimas 24 horas"""
-        cutoff_time = datetime.now() - timedelta(hours=24)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute('''
-                SELECT time_slot, timestamp, status, request_data, response_data, error_message
-                FROM monitoring_data 
-                WHERE service_name = ? AND timestamp >= ?
-                ORDER BY timestamp DESC
-            ''', (service_name, cutoff_time))
-            
-            result = {}
-            for row in cursor:
-                # Usar el time_slot más reciente si hay duplicados
-                if row['time_slot'] not in result:
-                    result[row['time_slot']] = {
-                        'timestamp': row['timestamp'],
-                        'status': row['status'],
-                        'request': row['request_data'] or '',
-                        'response': row['response_data'] or '',
-                        'error': row['error_message'] or ''
-                    }
+                (service_name, timestamp, slot, status, interval_minutes, latency_ms)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(row[0], row[1], row[2], row[3], row[7], row[8]) for row in rows])
+            
+            # Los payloads se enlazan a su verificación mediante la clave única
+            hashes = self._store_blobs(conn, [text for row in rows for text in (row[4], row[5])])
+            conn.executemany('''
+                INSERT OR REPLACE INTO probe_payloads (probe_id, request_hash, response_hash, error_message)
+                SELECT id, ?, ?, ? FROM monitoring_data
+                WHERE service_name = ? AND slot = ? AND timestamp = ?
+            ''', [(hashes[row[4]], hashes[row[5]], row[6], row[0], row[2], row[1]) for row in rows])
+            
+            self._refresh_rollups(conn, [(row[0], row[1], row[3], row[8]) for row in rows],
+                                  raw_cutoff_ms, existing)
             
-            return result
+            if self.write_listeners:
+                # Con un único escritor, todo id mayor al previo pertenece a este lote
+                cursor = conn.execute('''
+                    SELECT id, service_name, timestamp, slot, status, interval_minutes
+                    FROM monitoring_data WHERE id > ? ORDER BY id
+                ''', (previous_id,))
+                written = [dict(row) for row in cursor]
+        
+        for listener in self.write_listeners:
+            try:
+                listener(written)
+            except Exception as e:
+                print(f"Error notificando escritura: {e}")
+        
+        # La generación cambia después de los listeners: las cachés que se
+        # alimentan de ellos ya están al día cuando se invalidan las respuestas
+        self._bump_generation()
     
-    def get_all_services_data_last_24h(self) -> Dict[str, Dict]:
-        """Obtiene datos de todos los servicios de las últimas 24 horas"""
-        cutoff_time = datetime.now() - timedelta(hours=24)
+    def _refresh_rollups(self, conn: sqlite3.Connection, probes: List[Tuple],
+                         raw_cutoff_ms: int = 0, existing: Set[Tuple[str, int]] = frozenset()):
+        """Actualiza los buckets de resumen que contienen las verificaciones dadas.
         
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute('''
-                SELECT service_name, time_slot, timestamp, status, request_data, response_data, error_message
-                FROM monitoring_data 
-                WHERE timestamp >= ?
-                ORDER BY service_name, timestamp DESC
-            ''', (cutoff_time,))
+        `probes` son tuplas (service_name, timestamp_ms, status, latency_ms).
+        Los buckets que empiezan desde `raw_cutoff_ms` (el corte de la última
+        limpieza) se recalculan desde las verificaciones individuales que
+        contienen (como mucho 288 por día y servicio). Los anteriores ya no
+        tienen todas sus verificaciones en crudo: las nuevas se suman a la
+        fila guardada (conteos, suma y mínimo de latencia; el p95 guardado se
+        conserva) y las de `existing`, pares (service_name, timestamp_ms) que
+        ya estaban guardados, se omiten para no contarlas dos veces.
+        """
+        # Una sola vez por verificación aunque el lote la repita
+        probes = {(probe[0], probe[1]): probe for probe in probes}.values()
+        for table, bucket_ms in ROLLUP_TABLES.items():
+            buckets = set()
+            merged: Dict[Tuple[str, int], List[Tuple[str, Optional[int]]]] = {}
+            for service_name, timestamp, status, latency_ms in probes:
+                bucket_start = timestamp - timestamp % bucket_ms
+                if bucket_start >= raw_cutoff_ms:
+                    buckets.add((service_name, bucket_start))
+                elif (service_name, timestamp) not in existing:
+                    merged.setdefault((service_name, bucket_start), []).append((status, latency_ms))
             
-            result = {}
-            for row in cursor:
-                service_name = row['service_name']
-                if service_name not in result:
-                    result[service_name] = {}
+            for (service_name, bucket_start), added in merged.items():
+                latencies = sorted(latency_ms for _, latency_ms in added if latency_ms is not None)
+                success_count = sum(1 for status, _ in added if status == 'success')
+                conn.execute(f'''
+                    INSERT INTO {table}
+                    (service_name, bucket_start, success_count, failure_count,
+                     latency_count, latency_sum_ms, latency_min_ms, latency_p95_ms)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(service_name, bucket_start) DO UPDATE SET
+                        success_count = success_count + excluded.success_count,
+                        failure_count = failure_count + excluded.failure_count,
+                        latency_count = latency_count + excluded.latency_count,
+                        latency_sum_ms = latency_sum_ms + excluded.latency_sum_ms,
+                        latency_min_ms = COALESCE(MIN(latency_min_ms, excluded.latency_min_ms),
+                                                  latency_min_ms, excluded.latency_min_ms),
+                        latency_p95_ms = COALESCE(latency_p95_ms, excluded.latency_p95_ms)
+                ''', (service_name, bucket_start, success_count, len(added) - success_count,
+                      len(latencies), sum(latencies), latencies[0] if latencies else None,
+                      percentile(latencies, 0.95)))
+            
+            for service_name, bucket_start in buckets:
+                bucket_end = bucket_start + bucket_ms
+                cursor = conn.execute('''
+                    SELECT status, latency_ms FROM monitoring_data
+                    WHERE service_name = ? AND slot >= ? AND slot < ?
+                      AND timestamp >= ? AND timestamp < ?
+                ''', (service_name, bucket_start // SLOT_MS, bucket_end // SLOT_MS,
+                      bucket_start, bucket_end))
+                
+                success_count = failure_count = 0
+                latencies = []
+                for status, latency_ms in cursor:
+                    if status == 'success':
+                        success_count += 1
+                    else:
+                        failure_count += 1
+                    if latency_ms is not None:
+                        latencies.append(latency_ms)
+                latencies.sort()
                 
-                # Usar el time_slot más reciente si hay duplicados
-                if row['time_slot'] not in result[service_name]:
-                    result[service_name][row['time_slot']] = {
-                        'timestamp': row['timestamp'],
-                        'status': row['status'],
-                        'request': row['request_data'] or '',
-                        'response': row['response_data'] or '',
-                        'error': row['error_message'] or ''
+                conn.execute(f'''
+                    INSERT OR REPLACE INTO {table}
+                    (service_name, bucket_start, success_count, failure_count,
+                     latency_count, latency_sum_ms, latency_min_ms, latency_p95_ms)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (service_name, bucket_start, success_count, failure_count,
+                      len(latencies), sum(latencies), latencies[0] if latencies else None,
+                      percentile(latencies, 0.95)))
+    
+    @staticmethod
+    def _raw_cutoff_ms(conn: sqlite3.Connection) -> int:
+        """Corte de la última limpieza: antes de él ya no están todas las verificaciones en crudo"""
+        row = conn.execute("SELECT value FROM db_metadata WHERE key = 'raw_cutoff_ms'").fetchone()
+        return row[0] if row else 0
+    
+    @staticmethod
+    def _set_raw_cutoff_ms(conn: sqlite3.Connection, cutoff_ms: int):
+        conn.execute('''
+            INSERT INTO db_metadata (key, value) VALUES ('raw_cutoff_ms', ?)
+            ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)
+        ''', (cutoff_ms,))
+    
+    def _bump_generation(self):
+        with self._generation_lock:
+            self._generation += 1
+    
+    def get_generation(self) -> int:
+        """Generación actual de los datos; cambia cada vez que se escribe o se limpia"""
+        with self._generation_lock:
+            return self._generation
+    
+    def add_write_listener(self, listener: Callable[[List[Dict]], None]):
+        """Registra una función que recibe las verificaciones recién confirmadas"""
+        self.write_listeners.append(listener)
+    
+    def enqueue_monitoring_data(self, service_name: str, timestamp, status: str,
+                               request_data: str = '', response_data: str = '',
+                               error_message: str = '', interval_minutes: int = SLOT_MINUTES,
+                               slot: Optional[int] = None, latency_ms: Optional[int] = None):
+        """Encola datos de monitoreo para escritura agrupada sin bloquear al llamador"""
+        self.write_queue.put(self._build_row(service_name, timestamp, status, request_data,
+                                             response_data, error_message, interval_minutes,
+                                             slot, latency_ms))
+    
+    def flush_writes(self, timeout: Optional[float] = None) -> bool:
+        """Fuerza la escritura de los datos encolados"""
+        return self.write_queue.flush(timeout)
+    
+    def get_service_data_last_24h(self, service_name: str, since_id: Optional[int] = None,
+                                  until_id: Optional[int] = None) -> Dict[int, Dict]:
+        """Obtiene datos de un servicio de las últimas 24 horas.
+        
+        Con `since_id` solo se devuelven las verificaciones escritas después
+        de ese id (consulta incremental); `until_id` fija el cursor superior.
+        """
+        return self._get_latest_slots(service_name, since_id, until_id,
+                                      with_payloads=True).get(service_name, {})
+    
+    def get_all_services_data_last_24h(self, since_id: Optional[int] = None,
+                                       until_id: Optional[int] = None) -> Dict[str, Dict]:
+        """Obtiene datos de todos los servicios de las últimas 24 horas.
+        
+        Admite los mismos cursores `since_id`/`until_id` que
+        `get_service_data_last_24h`.
+        """
+        return self._get_latest_slots(None, since_id, until_id, with_payloads=True)
+    
+    def get_all_services_timeline_last_24h(self, service_name: Optional[str] = None,
+                                           since_id: Optional[int] = None,
+                                           until_id: Optional[int] = None) -> Dict[str, Dict]:
+        """Obtiene la línea de tiempo compacta (estado, timestamp e id) de las últimas 24 horas.
+        
+        No lee los payloads: la consulta se resuelve con el índice de cobertura.
+        Si se indica `service_name` solo se consulta ese servicio; `since_id` y
+        `until_id` limitan el resultado a las verificaciones nuevas.
+        """
+        return self._get_latest_slots(service_name, since_id, until_id, with_payloads=False)
+    
+    def _get_latest_slots(self, service_name: Optional[str], since_id: Optional[int],
+                          until_id: Optional[int], with_payloads: bool) -> Dict[str, Dict]:
+        """Verificación más reciente por servicio y segmento de las últimas 24 horas.
+        
+        La deduplicación la hace SQLite (`latest_per_slot_sql`); aquí solo se
+        arman los diccionarios a partir de tuplas, sin pasar por sqlite3.Row.
+        """
+        cutoff_ms = to_epoch_ms(datetime.now() - timedelta(hours=24))
+        # El filtro por slot acota el rango del índice; el de timestamp es el exacto
+        where = 'slot >= ? AND timestamp >= ?'
+        params = [slot_for(cutoff_ms), cutoff_ms]
+        if service_name:
+            where = 'service_name = ? AND ' + where
+            params.insert(0, service_name)
+        id_filter, id_params = cursor_filter('id', since_id, until_id)
+        where += id_filter
+        params.extend(id_params)
+        
+        if with_payloads:
+            query = latest_per_slot_sql(where) + f'''
+                SELECT l.service_name, l.covered_slot, l.timestamp, l.status,
+                       {PAYLOAD_COLUMNS}
+                FROM latest l
+                {payload_join('l.id')}
+            '''
+        else:
+            query = latest_per_slot_sql(where) + '''
+                SELECT service_name, covered_slot, id, timestamp, status
+                FROM latest
+            '''
+        
+        result = {}
+        with self.connections.reader() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(query, params)
+            
+            if with_payloads:
+                for name, slot, timestamp, status, request, response, error in cursor:
+                    service_slots = result.get(name)
+                    if service_slots is None:
+                        service_slots = result[name] = {}
+                    service_slots[slot] = {
+                        'timestamp': timestamp,
+                        'status': status,
+                        'request': request or '',
+                        'response': response or '',
+                        'error': error or ''
+                    }
+            else:
+                for name, slot, probe_id, timestamp, status in cursor:
+                    service_slots = result.get(name)
+                    if service_slots is None:
+                        service_slots = result[name] = {}
+                    service_slots[slot] = {
+                        'id': probe_id,
+                        'timestamp': timestamp,
+                        'status': status
                     }
+        
+        return result
+    
+    def get_service_timeline_last_24h(self, service_name: str, since_id: Optional[int] = None,
+                                      until_id: Optional[int] = None) -> Dict[int, Dict]:
+        """Obtiene la línea de tiempo compacta de un servicio de las últimas 24 horas"""
+        return self.get_all_services_timeline_last_24h(
+            service_name, since_id=since_id, until_id=until_id
+        ).get(service_name, {})
+    
+    def get_latest_probe_id(self) -> int:
+        """Id de la última verificación escrita; sirve como cursor incremental.
+        
+        Los ids son monótonos (AUTOINCREMENT) y un único escritor los confirma
+        en orden, así que todo lo escrito después tendrá un id mayor.
+        """
+        with self.connections.reader() as conn:
+            row = conn.execute('SELECT MAX(id) AS max_id FROM monitoring_data').fetchone()
+            return row['max_id'] or 0
+    
+    def get_probe(self, probe_id: int) -> Optional[Dict]:
+        """Obtiene el detalle completo (incluyendo payloads) de una verificación"""
+        with self.connections.reader() as conn:
+            row = conn.execute(f'''
+                SELECT m.id, m.service_name, m.timestamp, m.slot, m.status, m.interval_minutes,
+                       m.latency_ms,
+                       {PAYLOAD_COLUMNS}
+                FROM monitoring_data m
+                {payload_join('m.id')}
+                WHERE m.id = ?
+            ''', (probe_id,)).fetchone()
             
-            return result
+            if row is None:
+                return None
+            
+            return {
+                'id': row['id'],
+                'service_name': row['service_name'],
+                'timestamp': row['timestamp'],
+                'slot': row['slot'],
+                'status': row['status'],
+                'interval_minutes': row['interval_minutes'],
+                'latency_ms': row['latency_ms'],
+                'request': row['request_data'] or '',
+                'response': row['response_data'] or '',
+                'error': row['error_message'] or ''
+            }
     
-    def cleanup_old_data(self, hours_to_keep: int = 24):
-        """Elimina datos más antiguos del tiempo especificado"""
-        cutoff_time = datetime.now() - timedelta(hours=hours_to_keep)
+    def iter_probes_before(self, cutoff_ms: int, max_id: int) -> Iterator[Dict]:
+        """Genera las verificaciones completas (con payloads) anteriores a `cutoff_ms`.
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute('''
-                DELETE FROM monitoring_data 
-                WHERE timestamp < ?
-            ''', (cutoff_time,))
+        Se ordenan por servicio y timestamp y se leen de a una, sin cargar el
+        resultado completo en memoria. `max_id` excluye lo escrito después de
+        empezar a recorrer.
+        """
+        with self.connections.reader() as conn:
+            cursor = conn.execute(f'''
+                SELECT m.id, m.service_name, m.timestamp, m.slot, m.status,
+                       m.interval_minutes, m.latency_ms,
+                       {PAYLOAD_COLUMNS}
+                FROM monitoring_data m
+                {payload_join('m.id')}
+                WHERE m.timestamp < ? AND m.id <= ?
+                ORDER BY m.service_name, m.timestamp
+            ''', (cutoff_ms, max_id))
+            for row in cursor:
+                yield self._probe_record(row)
+    
+    def _probe_record(self, row) -> Dict:
+        """Verificación completa con las claves de PROBE_FIELDS"""
+        return {
+            'id': row['id'],
+            'service_name': row['service_name'],
+            'timestamp': row['timestamp'],
+            'slot': row['slot'],
+            'status': row['status'],
+            'interval_minutes': row['interval_minutes'],
+            'latency_ms': row['latency_ms'],
+            'request': row['request_data'] or '',
+            'response': row['response_data'] or '',
+            'error': row['error_message'] or ''
+        }
+    
+    def export_probes(self, start_ms: int, end_ms: int, service_name: Optional[str] = None,
+                      chunk_size: int = 1000) -> Iterator[Dict]:
+        """Genera las verificaciones completas de [start_ms, end_ms) ordenadas por timestamp.
+        
+        Lee por páginas de `chunk_size` filas con paginación por clave
+        (timestamp, id): cada página es una lectura corta, la memoria queda
+        acotada y el WAL se puede seguir consolidando mientras se exporta.
+        """
+        service_filter = ' AND m.service_name = ?' if service_name else ''
+        service_params = [service_name] if service_name else []
+        last_timestamp, last_id = start_ms, -1
+        
+        while True:
+            with self.connections.reader() as conn:
+                rows = conn.execute(f'''
+                    SELECT m.id, m.service_name, m.timestamp, m.slot, m.status,
+                           m.interval_minutes, m.latency_ms,
+                           {PAYLOAD_COLUMNS}
+                    FROM monitoring_data m INDEXED BY idx_timestamp
+                    {payload_join('m.id')}
+                    WHERE (m.timestamp, m.id) > (?, ?) AND m.timestamp < ?{service_filter}
+                    ORDER BY m.timestamp, m.id
+                    LIMIT ?
+                ''', (last_timestamp, last_id, end_ms, *service_params, chunk_size)).fetchall()
             
-            deleted_count = cursor.rowcount
-            conn.commit()
+            for row in rows:
+                yield self._probe_record(row)
             
-            return deleted_count
+            if len(rows) < chunk_size:
+                return
+            last_timestamp, last_id = rows[-1]['timestamp'], rows[-1]['id']
+    
+    def import_probes(self, probes: Iterable[Dict], chunk_size: int = 5000) -> int:
+        """Importa verificaciones desde un iterador, en lotes de `chunk_size` por transacción.
+        
+        Cada verificación es un diccionario con las claves de PROBE_FIELDS
+        (como las genera `export_probes`); `service_name` y `timestamp` son
+        obligatorias y `id` se ignora. El iterador se consume a medida que
+        se escribe, así que la memoria no depende del total importado.
+        Retorna la cantidad de verificaciones importadas.
+        """
+        imported = 0
+        chunk = []
+        for probe in probes:
+            chunk.append(self._build_row(
+                probe['service_name'], probe['timestamp'], probe.get('status') or 'unknown',
+                probe.get('request') or '', probe.get('response') or '', probe.get('error') or '',
+                probe.get('interval_minutes') or SLOT_MINUTES, probe.get('slot'), probe.get('latency_ms')
+            ))
+            if len(chunk) >= chunk_size:
+                self.insert_monitoring_batch(chunk)
+                imported += len(chunk)
+                chunk = []
+        
+        if chunk:
+            self.insert_monitoring_batch(chunk)
+            imported += len(chunk)
+        
+        return imported
+    
+    def import_ndjson(self, lines: Iterable, chunk_size: int = 5000) -> int:
+        """Importa un stream NDJSON (un archivo abierto o cualquier iterable de líneas)"""
+        return self.import_probes((json.loads(line) for line in lines if line.strip()), chunk_size)
+    
+    def cleanup_old_data(self, hours_to_keep: int = 24, archive=None,
+                         batch_size: int = 200, pause_seconds: float = 0.01):
+        """Elimina datos más antiguos del tiempo especificado.
+        
+        Si se indica `archive` (un `ProbeArchive`), las verificaciones se
+        copian al archivo frío antes de borrarlas. El borrado se hace por
+        rangos de ids de `batch_size` filas, cada uno en su propia
+        transacción corta y con una pausa entre lotes, para que las
+        escrituras de verificaciones nunca esperen detrás de la limpieza.
+        El espacio liberado se devuelve al disco con `reclaim_free_pages`.
+        """
+        cutoff_ms = to_epoch_ms(datetime.now() - timedelta(hours=hours_to_keep))
+        max_id = self.get_latest_probe_id()
+        
+        if archive is not None:
+            archive.append(self.iter_probes_before(cutoff_ms, max_id))
+        
+        # Antes de borrar: desde aquí los buckets anteriores al corte se
+        # actualizan sumando, no recalculando desde las filas en crudo
+        with self.connections.writer() as conn:
+            self._set_raw_cutoff_ms(conn, cutoff_ms)
+        
+        # Rango de ids a recorrer; se resuelve con el índice por timestamp
+        with self.connections.reader() as conn:
+            first_id, last_id = conn.execute('''
+                SELECT MIN(id), MAX(id) FROM monitoring_data
+                WHERE timestamp < ? AND id <= ?
+            ''', (cutoff_ms, max_id)).fetchone()
+        
+        deleted_count = 0
+        batch_start = first_id
+        while batch_start is not None and batch_start <= last_id:
+            batch_end = min(batch_start + batch_size - 1, last_id)
+            with self.connections.writer() as conn:
+                cursor = conn.execute('''
+                    DELETE FROM monitoring_data 
+                    WHERE id BETWEEN ? AND ? AND timestamp < ?
+                ''', (batch_start, batch_end, cutoff_ms))
+                deleted_count += cursor.rowcount
+                # Payloads que ya no usa ninguna verificación (índice parcial)
+                conn.execute('DELETE FROM payload_blobs WHERE refs <= 0')
+            batch_start = batch_end + 1
+            if batch_start <= last_id:
+                # Ceder el lock de escritura a las verificaciones en espera
+                time.sleep(pause_seconds)
+        
+        if deleted_count > 0:
+            self._bump_generation()
+        
+        return deleted_count
+    
+    def reclaim_free_pages(self, pages_per_step: int = 128, pause_seconds: float = 0.01) -> int:
+        """Devuelve al sistema las páginas libres con `PRAGMA incremental_vacuum`.
+        
+        Trabaja de a `pages_per_step` páginas para no retener el lock de
+        escritura. Retorna la cantidad de páginas recuperadas.
+        """
+        reclaimed = 0
+        while True:
+            with self.connections.writer() as conn:
+                free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                if free_pages == 0:
+                    break
+                # execute() solo avanza un paso del pragma (una página);
+                # executescript lo ejecuta completo
+                conn.executescript(f'PRAGMA incremental_vacuum({min(free_pages, pages_per_step)})')
+                step = free_pages - conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if step <= 0:
+                break
+            reclaimed += step
+            time.sleep(pause_seconds)
+        return reclaimed
+    
+    def cleanup_old_rollups(self, hourly_days_to_keep: int = 90, daily_days_to_keep: int = 400):
+        """Elimina los resúmenes por hora y por día más antiguos que su retención"""
+        now_ms = to_epoch_ms(datetime.now())
+        retention = {
+            'rollup_hourly': hourly_days_to_keep,
+            'rollup_daily': daily_days_to_keep,
+        }
+        
+        deleted_count = 0
+        with self.connections.writer() as conn:
+            for table, days in retention.items():
+                cursor = conn.execute(f'DELETE FROM {table} WHERE bucket_start < ?',
+                                      (now_ms - days * DAY_MS,))
+                deleted_count += cursor.rowcount
+        
+        return deleted_count
+    
+    def get_uptime(self, service_name: str, range_key: str = '7d') -> Optional[Dict]:
+        """Disponibilidad y latencia de un servicio leyendo solo los resúmenes.
+        
+        `range_key` es una clave de UPTIME_RANGES: 7 días se responden con
+        buckets por hora (168 filas) y 30 o 90 días con buckets por día.
+        Retorna None si el rango no existe. El p95 del rango completo se
+        aproxima con los p95 de cada bucket ponderados por cantidad de
+        muestras.
+        """
+        if range_key not in UPTIME_RANGES:
+            return None
+        table, days = UPTIME_RANGES[range_key]
+        bucket_ms = ROLLUP_TABLES[table]
+        now_ms = to_epoch_ms(datetime.now())
+        start_ms = now_ms - days * DAY_MS
+        start_ms -= start_ms % bucket_ms
+        
+        with self.connections.reader() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(f'''
+                SELECT bucket_start, success_count, failure_count, latency_count,
+                       latency_sum_ms, latency_min_ms, latency_p95_ms
+                FROM {table}
+                WHERE service_name = ? AND bucket_start >= ?
+                ORDER BY bucket_start
+            ''', (service_name, start_ms))
+            rows = cursor.fetchall()
+        
+        buckets = []
+        success_total = failure_total = latency_count_total = latency_sum_total = 0
+        latency_min = None
+        p95_samples = []
+        for start, success, failure, latency_count, latency_sum, latency_min_ms, latency_p95_ms in rows:
+            total = success + failure
+            buckets.append({
+                'start': start,
+                'success_count': success,
+                'failure_count': failure,
+                'availability': round(success / total * 100, 3) if total else None,
+                'latency_min_ms': latency_min_ms,
+                'latency_avg_ms': round(latency_sum / latency_count) if latency_count else None,
+                'latency_p95_ms': latency_p95_ms
+            })
+            success_total += success
+            failure_total += failure
+            latency_count_total += latency_count
+            latency_sum_total += latency_sum
+            if latency_min_ms is not None:
+                latency_min = latency_min_ms if latency_min is None else min(latency_min, latency_min_ms)
+            if latency_p95_ms is not None:
+                p95_samples.append((latency_p95_ms, latency_count))
+        
+        # Percentil ponderado de los p95 de cada bucket
+        latency_p95 = None
+        if p95_samples:
+            p95_samples.sort()
+            threshold = sum(count for _, count in p95_samples) * 0.95
+            accumulated = 0
+            for value, count in p95_samples:
+                accumulated += count
+                latency_p95 = value
+                if accumulated >= threshold:
+                    break
+        
+        total = success_total + failure_total
+        return {
+            'service_name': service_name,
+            'range': range_key,
+            'resolution': 'hour' if bucket_ms == HOUR_MS else 'day',
+            'from': start_ms,
+            'to': now_ms,
+            'success_count': success_total,
+            'failure_count': failure_total,
+            'availability': round(success_total / total * 100, 3) if total else None,
+            'latency_min_ms': latency_min,
+            'latency_avg_ms': round(latency_sum_total / latency_count_total) if latency_count_total else None,
+            'latency_p95_ms': latency_p95,
+            'buckets': buckets
+        }
     
     def get_database_stats(self) -> Dict:
-        """Obtiene estadísticas de la base de datos"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            
-            # Total de registros
-            total_records = conn.execute('SELECT COUNT(*) as count FROM monitoring_data').fetchone()['count']
+        """Obtiene estadísticas de la base de datos.
+        
+        Los conteos salen de `service_stats` (una fila por servicio) y el
+        tamaño de los pragmas de SQLite, sin recorrer monitoring_data.
+        """
+        with self.connections.reader() as conn:
             
             # Registros por servicio
             services_cursor = conn.execute('''
-                SELECT service_name, COUNT(*) as count, 
-                       MIN(timestamp) as oldest, 
-                       MAX(timestamp) as newest
-                FROM monitoring_data 
-                GROUP BY service_name
+                SELECT service_name, total_records, oldest_timestamp, newest_timestamp
+                FROM service_stats
+                ORDER BY service_name
             ''')
             
             services_stats = {}
             for row in services_cursor:
                 services_stats[row['service_name']] = {
-                    'total_records': row['count'],
-                    'oldest_record': row['oldest'],
-                    'newest_record': row['newest']
+                    'total_records': row['total_records'],
+                    'oldest_record': row['oldest_timestamp'],
+                    'newest_record': row['newest_timestamp']
                 }
             
-            # Tamaño del archivo de base de datos
-            db_size = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+            # Payloads únicos: tamaño original y comprimido
+            blobs = conn.execute('''
+                SELECT COUNT(*) AS count, TOTAL(size) AS raw_bytes, TOTAL(LENGTH(data)) AS stored_bytes
+                FROM payload_blobs
+            ''').fetchone()
             
-            return {
-                'total_records': total_records,
-                'services': services_stats,
-                'database_size_bytes': db_size,
-                'database_size_mb': round(db_size / (1024 * 1024), 2)
-            }
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+            page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+            freelist_count = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        
+        # Tamaño del archivo de base de datos y del WAL pendiente de checkpoint
+        db_size = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        wal_path = f'{self.db_path}-wal'
+        wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        
+        return {
+            'total_records': sum(stats['total_records'] for stats in services_stats.values()),
+            'services': services_stats,
+            'database_size_bytes': db_size,
+            'database_size_mb': round(db_size / (1024 * 1024), 2),
+            'page_size': page_size,
+            'page_count': page_count,
+            'freelist_count': freelist_count,
+            'freelist_bytes': freelist_count * page_size,
+            'wal_size_bytes': wal_size,
+            'payload_blobs': {
+                'count': blobs['count'],
+                'raw_bytes': int(blobs['raw_bytes']),
+                'stored_bytes': int(blobs['stored_bytes'])
+            },
+            'pending_writes': self.write_queue.depth(),
+            'dropped_writes': self.write_queue.dropped
+        }
     
     def migrate_from_memory_data(self, memory_data: Dict):
         """Migra datos existentes en memoria a la base de datos"""
-        migrated_count = 0
-        
-        for service_name, service_data in memory_data.items():
-            for time_slot, data in service_data.items():
-                try:
-                    # Intentar parsear el timestamp existente
-                    if 'timestamp' in data:
-                        timestamp = datetime.fromisoformat(data['timestamp'].replace('Z', '+00:00'))
-                    else:
-                        # Si no hay timestamp, usar fecha actual con la hora del time_slot
-                        now = datetime.now()
-                        hour, minute = map(int, time_slot.split(':'))
-                        timestamp = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-                    
-                    self.insert_monitoring_data(
-                        service_name=service_name,
-                        timestamp=timestamp,
-                        time_slot=time_slot,
-                        status=data.get('status', 'unknown'),
-                        request_data=data.get('request', ''),
-                        response_data=data.get('response', ''),
-                        error_message=data.get('error', '')
-                    )
-                    migrated_count += 1
+        def records():
+            for service_name, service_data in memory_data.items():
+                for time_slot, data in service_data.items():
+                    try:
+                        # Intentar parsear el timestamp existente
+                        if 'timestamp' in data:
+                            timestamp = to_epoch_ms(data['timestamp'])
+                        else:
+                            # Si no hay timestamp, usar fecha actual con la hora del time_slot
+                            now = datetime.now()
+                            hour, minute = map(int, time_slot.split(':'))
+                            timestamp = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+                    except Exception as e:
+                        print(f"Error migrando datos para {service_name} {time_slot}: {e}")
+                        continue
                     
-                except Exception as e:
-                    print(f"Error migrando datos para {service_name} {time_slot}: {e}")
-                    continue
+                    yield {
+                        'service_name': service_name,
+                        'timestamp': timestamp,
+                        'status': data.get('status', 'unknown'),
+                        'request': data.get('request', ''),
+                        'response': data.get('response', ''),
+                        'error': data.get('error', '')
+                    }
         
-        return migrated_count 
\ No newline at end of file
+        return self.import_probes(records())
@@ -0,0 +1,85 @@
+import json
+import threading
+from collections import deque
+from typing import Any, Dict, Iterator, Optional
+
+
+class EventBroadcaster:
+    """Difunde eventos Server-Sent Events a todos los clientes conectados.
+
+    Cada evento se serializa una sola vez al publicarse y se guarda en un
+    historial acotado en memoria; los clientes leen de ese historial, por lo
+    que conectar más clientes no genera consultas adicionales a la base de
+    datos. Los ids de evento son crecientes y permiten reanudar con
+    `Last-Event-ID`.
+    """
+
+    def __init__(self, history_size: int = 1000, heartbeat_seconds: float = 15,
+                 start_id: int = 0):
+        """`start_id` es el último id ya persistido al arrancar: los clientes
+        que pidan reanudar desde antes reciben un `reset`."""
+        self.heartbeat_seconds = heartbeat_seconds
+        self._condition = threading.Condition()
+        self._history = deque(maxlen=history_size)
+        self._latest_id = start_id
+        self._evicted_id = start_id
+        self._subscribers = 0
+
+    def publish(self, event_type: str, data: Dict[str, Any], event_id: int):
+        """Publica un evento y despierta a los clientes en espera"""
+        frame = f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+        with self._condition:
+            if len(self._history) == self._history.maxlen:
+                self._evicted_id = self._history[0][0]
+            self._history.append((event_id, frame))
+            self._latest_id = max(self._latest_id, event_id)
+            self._condition.notify_all()
+
+    def subscriber_count(self) -> int:
+        """Cantidad de clientes conectados al stream"""
+        with self._condition:
+            return self._subscribers
+
+    def _pending(self, last_id: int):
+        """Eventos del historial posteriores a `last_id`"""
+        return [(event_id, frame) for event_id, frame in self._history if event_id > last_id]
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Iterator[str]:
+        """Genera los frames SSE para un cliente.
+
+        Sin `last_event_id` el cliente recibe solo los eventos nuevos. Si el
+        id pedido ya salió del historial, o es mayor que el último publicado
+        (la base de datos se reemplazó y los ids volvieron a empezar), se
+        envía un evento `reset` para que el cliente recargue los datos
+        completos.
+        """
+        with self._condition:
+            self._subscribers += 1
+            last_id = self._latest_id if last_event_id is None else last_event_id
+            needs_reset = last_event_id is not None and last_event_id < self._evicted_id
+            if last_event_id is not None and last_event_id > self._latest_id:
+                # Un id del futuro: continuar desde el último publicado
+                needs_reset = True
+                last_id = self._latest_id
+
+        try:
+            yield f"retry: {int(self.heartbeat_seconds * 1000)}\n\n"
+            if needs_reset:
+                yield f"event: reset\ndata: {json.dumps({'cursor': last_id})}\n\n"
+
+            while True:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._latest_id > last_id,
+                                             timeout=self.heartbeat_seconds)
+                    pending = self._pending(last_id)
+
+                if not pending:
+                    yield ": heartbeat\n\n"
+                    continue
+
+                for event_id, frame in pending:
+                    last_id = event_id
+                    yield frame
+        finally:
+            with self._condition:
+                self._subscribers -= 1
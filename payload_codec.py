@@ -0,0 +1,64 @@
+import hashlib
+import zlib
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# Compresor opcional: se usa solo si la librería está instalada
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Valores de payload_blobs.codec
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 6
+
+# Por debajo de este tamaño la compresión no reduce nada
+MIN_COMPRESS_BYTES = 64
+
+
+def payload_hash(text: str) -> Optional[bytes]:
+    """Hash SHA-256 del contenido; None para payloads vacíos (no se guardan)"""
+    if not text:
+        return None
+    return hashlib.sha256(text.encode('utf-8')).digest()
+
+
+def encode_payload(text: str) -> Tuple[int, bytes, int]:
+    """Comprime un payload y retorna (codec, datos, tamaño original en bytes).
+
+    Si la compresión no reduce el tamaño se guarda el texto tal cual.
+    """
+    raw = text.encode('utf-8')
+    if len(raw) < MIN_COMPRESS_BYTES:
+        return CODEC_RAW, raw, len(raw)
+    if zstandard is not None:
+        codec, data = CODEC_ZSTD, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    else:
+        codec, data = CODEC_ZLIB, zlib.compress(raw, ZLIB_LEVEL)
+    if len(data) >= len(raw):
+        return CODEC_RAW, raw, len(raw)
+    return codec, data, len(raw)
+
+
+@lru_cache(maxsize=1024)
+def decode_payload(codec: Optional[int], data: Optional[bytes]) -> Optional[str]:
+    """Texto original de un payload guardado con `encode_payload`.
+
+    Se registra en SQLite como la función `payload_text(codec, data)`; la
+    caché evita descomprimir una y otra vez el mismo contenido, que es lo
+    habitual entre verificaciones consecutivas.
+    """
+    if data is None:
+        return None
+    if codec == CODEC_ZLIB:
+        data = zlib.decompress(data)
+    elif codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read zstd-compressed payloads')
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return bytes(data).decode('utf-8')
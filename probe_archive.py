@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator
+
+from database import DAY_MS, HOUR_MS
+
+# Tamaño de lectura al descomprimir; nunca se carga un día completo en memoria
+READ_CHUNK_BYTES = 64 * 1024
+
+class ProbeArchive:
+    """Archivo frío de verificaciones en archivos NDJSON comprimidos por día.
+
+    Cada día (UTC) tiene un archivo `<YYYY-MM-DD>.ndjson.gz` al que solo se
+    agregan datos: cada servicio y hora se escribe como un miembro gzip
+    independiente, así que el archivo completo sigue siendo un gzip válido.
+    El índice `<YYYY-MM-DD>.index.ndjson` guarda offset y longitud de cada
+    miembro para leer un servicio y rango de horas sin descomprimir el resto
+    del día.
+    """
+
+    def __init__(self, directory: str, compress_level: int = 6):
+        self.directory = directory
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _day(self, timestamp_ms: int) -> str:
+        return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+    def _data_path(self, day: str) -> str:
+        return os.path.join(self.directory, f'{day}.ndjson.gz')
+
+    def _index_path(self, day: str) -> str:
+        return os.path.join(self.directory, f'{day}.index.ndjson')
+
+    def append(self, probes: Iterable[Dict]) -> int:
+        """Agrega verificaciones al archivo y retorna cuántas se escribieron.
+
+        `probes` debe venir ordenado por servicio y timestamp (como lo
+        entrega `MonitoringDatabase.iter_probes_before`); se consume como
+        iterador y cada grupo de servicio y hora se comprime a medida que
+        llega.
+        """
+        written = 0
+        group = None
+        member = None
+        with self._lock:
+            try:
+                for probe in probes:
+                    timestamp = probe['timestamp']
+                    key = (self._day(timestamp), probe['service_name'],
+                           timestamp - timestamp % HOUR_MS)
+                    if key != group:
+                        if member is not None:
+                            self._close_member(member)
+                        group = key
+                        member = self._open_member(*key)
+                    line = json.dumps(probe, separators=(',', ':')) + '\n'
+                    member['file'].write(member['compressor'].compress(line.encode('utf-8')))
+                    member['count'] += 1
+                    written += 1
+            finally:
+                if member is not None:
+                    self._close_member(member)
+        return written
+
+    def _open_member(self, day: str, service_name: str, hour_start: int) -> Dict:
+        data_file = open(self._data_path(day), 'ab')
+        return {
+            'day': day,
+            'service_name': service_name,
+            'hour': hour_start,
+            'file': data_file,
+            'offset': data_file.tell(),
+            'count': 0,
+            # wbits=31: formato gzip, cada miembro se puede leer por separado
+            'compressor': zlib.compressobj(self.compress_level, zlib.DEFLATED, 31)
+        }
+
+    def _close_member(self, member: Dict):
+        data_file = member['file']
+        data_file.write(member['compressor'].flush())
+        length = data_file.tell() - member['offset']
+        data_file.flush()
+        os.fsync(data_file.fileno())
+        data_file.close()
+
+        # El índice se escribe después de los datos: un corte intermedio
+        # deja un miembro sin indexar, nunca un índice que apunta a la nada
+        entry = {
+            'service_name': member['service_name'],
+            'hour': member['hour'],
+            'offset': member['offset'],
+            'length': length,
+            'count': member['count']
+        }
+        with open(self._index_path(member['day']), 'a', encoding='utf-8') as index_file:
+            index_file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+    def read(self, service_name: str, start_ms: int, end_ms: int) -> Iterator[Dict]:
+        """Genera las verificaciones archivadas de un servicio en [start_ms, end_ms).
+
+        Solo se leen los miembros del índice que coinciden con el servicio y
+        las horas pedidas, por bloques de `READ_CHUNK_BYTES`.
+        """
+        day_start = start_ms - start_ms % DAY_MS
+        for day_ms in range(day_start, end_ms, DAY_MS):
+            day = self._day(day_ms)
+            index_path = self._index_path(day)
+            if not os.path.exists(index_path):
+                continue
+
+            with open(index_path, encoding='utf-8') as index_file:
+                entries = [entry for entry in map(json.loads, index_file)
+                           if entry['service_name'] == service_name and
+                           entry['hour'] < end_ms and entry['hour'] + HOUR_MS > start_ms]
+            entries.sort(key=lambda entry: (entry['hour'], entry['offset']))
+
+            with open(self._data_path(day), 'rb') as data_file:
+                for entry in entries:
+                    for probe in self._read_member(data_file, entry['offset'], entry['length']):
+                        if start_ms <= probe['timestamp'] < end_ms:
+                            yield probe
+
+    def _read_member(self, data_file, offset: int, length: int) -> Iterator[Dict]:
+        data_file.seek(offset)
+        decompressor = zlib.decompressobj(31)
+        pending = b''
+        remaining = length
+        while remaining > 0:
+            chunk = data_file.read(min(READ_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            pending += decompressor.decompress(chunk)
+            lines = pending.split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                if line:
+                    yield json.loads(line)
+        pending += decompressor.flush()
+        if pending.strip():
+            yield json.loads(pending)
+
+    def stats(self) -> Dict:
+        """Cantidad de días archivados y tamaño total en disco"""
+        days = [name for name in os.listdir(self.directory) if name.endswith('.ndjson.gz')]
+        size = sum(os.path.getsize(os.path.join(self.directory, name))
+                   for name in os.listdir(self.directory))
+        return {
+            'days': len(days),
+            'oldest_day': min(days)[:10] if days else None,
+            'size_bytes': size
+        }
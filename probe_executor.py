@@ -0,0 +1,102 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+
+class ProbeExecutor:
+    """Ejecuta las verificaciones de servicios en paralelo con un pool acotado.
+
+    Cada servicio tiene como máximo una verificación en curso. Si una
+    verificación supera su plazo (deadline) se reporta como error mediante
+    ``on_timeout`` y su resultado tardío se descarta, de modo que un upstream
+    lento no retrasa ni ensucia los datos de los demás servicios. El plazo
+    corre desde que la verificación empieza a ejecutarse (no mientras espera
+    en la cola) y una verificación vencida sigue bloqueando al servicio
+    hasta que su hilo termina, para que un upstream colgado no acumule
+    hilos ocupando el pool.
+    """
+
+    def __init__(self, max_workers: int = 4, deadline_seconds: float = 90):
+        self.max_workers = max_workers
+        self.deadline_seconds = deadline_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='probe')
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Dict[str, Any]] = {}
+
+    def submit(self, name: str, probe: Callable[[], Any],
+               on_result: Callable[[Any], None],
+               on_timeout: Optional[Callable[[float], None]] = None) -> bool:
+        """Programa una verificación; retorna False si ya hay una en curso"""
+        with self._lock:
+            if name in self._in_flight:
+                return False
+            entry = {'started': None, 'expired': False, 'on_timeout': on_timeout}
+            self._in_flight[name] = entry
+
+        try:
+            self._pool.submit(self._run, name, entry, probe, on_result)
+        except RuntimeError:
+            # El pool ya fue cerrado (apagado de la aplicación)
+            with self._lock:
+                self._in_flight.pop(name, None)
+            return False
+        return True
+
+    def _run(self, name: str, entry: Dict[str, Any], probe: Callable[[], Any],
+             on_result: Callable[[Any], None]):
+        """Ejecuta la verificación en un hilo del pool"""
+        with self._lock:
+            entry['started'] = time.monotonic()
+        try:
+            result = probe()
+            with self._lock:
+                expired = entry['expired']
+            if not expired:
+                on_result(result)
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {name.upper()}: ❌ EXCEPTION - {str(e)}")
+        finally:
+            with self._lock:
+                if self._in_flight.get(name) is entry:
+                    del self._in_flight[name]
+
+    def reap_expired(self):
+        """Marca como vencidas las verificaciones que superaron el plazo.
+
+        Se invoca periódicamente desde el hilo del scheduler. Las que siguen
+        en la cola no vencen; la vencida se reporta una sola vez y el
+        servicio queda bloqueado hasta que su hilo retorne.
+        """
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for name, entry in self._in_flight.items():
+                if entry['started'] is None or entry['expired']:
+                    continue
+                elapsed = now - entry['started']
+                if elapsed >= self.deadline_seconds:
+                    entry['expired'] = True
+                    expired.append((name, entry, elapsed))
+
+        for name, entry, elapsed in expired:
+            if entry['on_timeout']:
+                try:
+                    entry['on_timeout'](elapsed)
+                except Exception as e:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] {name.upper()}: ❌ EXCEPTION - {str(e)}")
+
+    def in_flight(self) -> Dict[str, float]:
+        """Retorna los servicios en curso (sin los vencidos) y los segundos que llevan ejecutándose.
+
+        Las verificaciones que aún esperan en la cola figuran con 0.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {name: round(now - entry['started'], 1) if entry['started'] is not None else 0.0
+                    for name, entry in self._in_flight.items() if not entry['expired']}
+
+    def shutdown(self, wait: bool = True):
+        """Detiene el pool de verificaciones"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,93 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from compression import compress
+
+
+class CachedResponse:
+    """Cuerpo ya serializado de una respuesta junto con su ETag.
+
+    Las versiones comprimidas se calculan la primera vez que se piden y se
+    reutilizan en las siguientes respuestas.
+    """
+
+    __slots__ = ('body', 'etag', 'headers', 'generation', 'created', '_encoded')
+
+    def __init__(self, body: bytes, headers: Dict[str, str], generation: int):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.headers = headers
+        self.generation = generation
+        self.created = time.monotonic()
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded_body(self, encoding: Optional[str]) -> bytes:
+        """Cuerpo en la codificación pedida (None para sin comprimir)"""
+        if encoding is None:
+            return self.body
+        encoded = self._encoded.get(encoding)
+        if encoded is None:
+            # Dos hilos pueden comprimir a la vez; el resultado es idéntico
+            encoded = compress(self.body, encoding)
+            self._encoded[encoding] = encoded
+        return encoded
+
+    def encoded_etag(self, encoding: Optional[str]) -> str:
+        """ETag fuerte de la representación (distinto por codificación)"""
+        return self.etag if encoding is None else f'{self.etag}-{encoding}'
+
+
+class ResponseCache:
+    """Caché en memoria de respuestas pre-serializadas por generación de datos.
+
+    Una entrada es válida mientras la generación de la base de datos no
+    cambie y no supere `max_age_seconds` (la ventana de 24 horas avanza aunque
+    no haya escrituras). Las entradas menos usadas se descartan al superar
+    `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 256, max_age_seconds: float = 60):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self._entries: 'OrderedDict[str, CachedResponse]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: str, generation: int,
+                     build: Callable[[], Tuple[bytes, Dict[str, str]]]) -> CachedResponse:
+        """Retorna la respuesta en caché o la construye con `build`"""
+        entry = self._get(key, generation)
+        if entry is not None:
+            return entry
+
+        body, headers = build()
+        entry = CachedResponse(body, headers, generation)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _get(self, key: str, generation: int) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if (entry.generation != generation or
+                    time.monotonic() - entry.created > self.max_age_seconds):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def clear(self):
+        """Vacía la caché"""
+        with self._lock:
+            self._entries.clear()
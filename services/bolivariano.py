@@ -1,4 +1,3 @@
-import requests
 import json
 from datetime import datetime
 from typing import Dict, Any
@@ -8,6 +7,9 @@ import os
 # Agregar el directorio padre al path para importar config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config
+from services.http_client import get_session, get_timeout
+from services.token_cache import TokenCache
+from services.evidence import EvidencePolicy
 
 class BolivarianoService:
     def __init__(self):
@@ -19,6 +21,9 @@ class BolivarianoService:
         self.username = service_config.get('username')
         self.password = service_config.get('password')
         self.token = None
+        self.session = get_session('bolivariano')
+        self.token_cache = TokenCache(Config.TOKEN_TTL_SECONDS, Config.TOKEN_REFRESH_MARGIN_SECONDS)
+        self.evidence = EvidencePolicy(**Config.get_evidence_config('bolivariano'))
         
     def get_token(self) -> Dict[str, Any]:
         """Obtiene el token de autenticación"""
@@ -34,7 +39,7 @@ class BolivarianoService:
         }
         
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response = self.session.post(url, headers=headers, json=payload, timeout=get_timeout())
             request_data = {
                 "url": url,
                 "method": "POST",
@@ -94,10 +99,23 @@ class BolivarianoService:
                 'response': ''
             }
     
-    def check_trips_api(self) -> Dict[str, Any]:
-        """Verifica la API de viajes disponibles"""
-        # Siempre obtener un token nuevo para evitar problemas de vencimiento
+    def ensure_token(self) -> Dict[str, Any]:
+        """Reutiliza el token en caché o inicia sesión si está por vencer"""
+        cached_token = self.token_cache.get()
+        if cached_token:
+            self.token = cached_token
+            return {'success': True, 'token': cached_token, 'cached': True}
+        
         token_result = self.get_token()
+        self.token_cache.record_login(token_result['success'], token_result.get('error', ''))
+        if token_result['success']:
+            self.token_cache.store(self.token)
+        return token_result
+    
+    def check_trips_api(self, retry_on_unauthorized: bool = True) -> Dict[str, Any]:
+        """Verifica la API de viajes disponibles"""
+        # Reutilizar el token mientras siga vigente
+        token_result = self.ensure_token()
         if not token_result['success']:
             return token_result
         
@@ -124,7 +142,12 @@ class BolivarianoService:
         }
         
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response = self.session.post(url, headers=headers, json=payload, timeout=get_timeout())
+            
+            if response.status_code == 401 and retry_on_unauthorized:
+                # Token rechazado: descartarlo y reintentar una vez con login nuevo
+                self.token_cache.invalidate()
+                return self.check_trips_api(retry_on_unauthorized=False)
             
             request_data = {
                 "url": url,
@@ -209,7 +232,9 @@ class BolivarianoService:
             return {
                 'status': 'success',
                 'request': json.dumps(sanitized_request, indent=2),
-                'response': json.dumps(result['response'], indent=2)
+                # Resumida antes de serializar: nunca se formatea la respuesta completa
+                'response': self.evidence.render(result['response']),
+                'login': self.token_cache.health()
             }
         else:
             # Sanitizar datos antes de enviar al frontend
@@ -218,6 +243,7 @@ class BolivarianoService:
             return {
                 'status': 'error',
                 'request': json.dumps(sanitized_request, indent=2) if sanitized_request else '',
-                'response': json.dumps(result['response'], indent=2) if 'response' in result else '',
-                'error': result['error']
+                'response': self.evidence.render(result['response']) if 'response' in result else '',
+                'error': result['error'],
+                'login': self.token_cache.health()
             } 
\ No newline at end of file
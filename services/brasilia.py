@@ -1,5 +1,5 @@
-import requests
 import json
+import re
 from datetime import datetime
 from typing import Dict, Any
 import sys
@@ -8,17 +8,37 @@ import os
 # Agregar el directorio padre al path para importar config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config
+from services.http_client import get_session, get_timeout
+from services.token_cache import shared_token_cache
+from services.evidence import EvidencePolicy
 
 class BrasiliaService:
+    """Verificación de un host de BrasiliaServices (familia Brasilia).
+    
+    Los servicios de la familia usan el mismo login: con el mismo backend
+    (`auth_scope`) y las mismas credenciales comparten la caché de token y
+    la cookie JSESSIONID, así que se inicia sesión una vez para todos.
+    """
+    service_key = 'brasilia'
+    display_name = "Brasilia"
+    default_base_url = "https://webservices.expresobrasilia.co/BrasiliaServices"
+    
     def __init__(self):
-        self.name = "Brasilia"
-        self.base_url = "https://webservices.expresobrasilia.co/BrasiliaServices"
+        self.name = self.display_name
+        self.base_url = self.default_base_url
         
         # Obtener credenciales de forma segura
-        service_config = Config.get_service_config('brasilia')
+        service_config = Config.get_service_config(self.service_key)
         self.username = service_config.get('username')
         self.password = service_config.get('password')
         self.token = None
+        self.session_id = None
+        self.session = get_session(self.service_key)
+        self.token_cache = shared_token_cache(
+            (service_config.get('auth_scope'), self.username, self.password),
+            Config.TOKEN_TTL_SECONDS, Config.TOKEN_REFRESH_MARGIN_SECONDS
+        )
+        self.evidence = EvidencePolicy(**Config.get_evidence_config(self.service_key))
         
     def get_token(self) -> Dict[str, Any]:
         """Obtiene el token de autenticación"""
@@ -30,8 +50,9 @@ class BrasiliaService:
             'password': self.password
         }
         
+        self.session_id = None
         try:
-            response = requests.post(url, params=params, timeout=30)
+            response = self.session.post(url, params=params, timeout=get_timeout())
             request_data = {
                 "url": f"{url}?username={self.username}&password={self.password}",
                 "method": "POST",
@@ -43,6 +64,10 @@ class BrasiliaService:
                 # La respuesta puede ser texto plano con el token o JSON
                 response_text = response.text.strip()
                 
+                # Capturar JSESSIONID de las cookies; solo se reenvía si este login lo entregó
+                match = re.search(r'JSESSIONID=([^;]+)', response.headers.get('Set-Cookie', ''))
+                self.session_id = match.group(1) if match else None
+                
                 # Intentar parsear como JSON primero
                 try:
                     data = response.json()
@@ -64,6 +89,7 @@ class BrasiliaService:
                         return {
                             'success': True,
                             'token': self.token,
+                            'session_id': self.session_id,
                             'request': request_data,
                             'response': data
                         }
@@ -82,6 +108,7 @@ class BrasiliaService:
                         return {
                             'success': True,
                             'token': self.token,
+                            'session_id': self.session_id,
                             'request': request_data,
                             'response': response_text
                         }
@@ -113,10 +140,32 @@ class BrasiliaService:
                 'response': ''
             }
     
-    def check_trips_api(self) -> Dict[str, Any]:
+    def ensure_token(self) -> Dict[str, Any]:
+        """Reutiliza el token en caché o inicia sesión si está por vencer.
+        
+        El login se hace con el lock de la caché compartida: si otro servicio
+        de la familia está iniciando sesión, se espera y se usa su token.
+        """
+        cached_token = self.token_cache.get()
+        if not cached_token:
+            with self.token_cache.login_lock:
+                cached_token = self.token_cache.get()
+                if not cached_token:
+                    token_result = self.get_token()
+                    self.token_cache.record_login(token_result['success'], token_result.get('error', ''))
+                    if token_result['success']:
+                        cookies = {'JSESSIONID': self.session_id} if self.session_id else None
+                        self.token_cache.store(self.token, cookies)
+                    return token_result
+        
+        self.token = cached_token
+        self.session_id = self.token_cache.cookies().get('JSESSIONID')
+        return {'success': True, 'token': cached_token, 'cached': True}
+    
+    def check_trips_api(self, retry_on_unauthorized: bool = True) -> Dict[str, Any]:
         """Verifica la API de viajes disponibles"""
-        # Siempre obtener un token nuevo para evitar problemas de vencimiento
-        token_result = self.get_token()
+        # Reutilizar el token mientras siga vigente
+        token_result = self.ensure_token()
         if not token_result['success']:
             return token_result
         
@@ -129,6 +178,10 @@ class BrasiliaService:
             'Authorization': f'Bearer {self.token}'
         }
         
+        # Agregar Cookie JSESSIONID si está disponible
+        if self.session_id:
+            headers['Cookie'] = f'JSESSIONID={self.session_id}'
+        
         # Los parámetros van como query parameters
         params = {
             'codOrigen': 'BOG',
@@ -137,7 +190,12 @@ class BrasiliaService:
         }
         
         try:
-            response = requests.post(url, headers=headers, params=params, timeout=30)
+            response = self.session.post(url, headers=headers, params=params, timeout=get_timeout())
+            
+            if response.status_code == 401 and retry_on_unauthorized:
+                # Token rechazado: descartarlo y reintentar una vez con login nuevo
+                self.token_cache.invalidate(self.token)
+                return self.check_trips_api(retry_on_unauthorized=False)
             
             request_data = {
                 "url": f"{url}?codOrigen=BOG&codDestino=MDE&fechaViaje={current_date}",
@@ -214,6 +272,8 @@ class BrasiliaService:
             headers = sanitized['headers'].copy()
             if 'Authorization' in headers:
                 headers['Authorization'] = 'Bearer [TOKEN_OCULTO]'
+            if 'Cookie' in headers:
+                headers['Cookie'] = 'JSESSIONID=[SESSION_OCULTA]'
             sanitized['headers'] = headers
         
         # Eliminar credenciales de los parámetros de la URL
@@ -221,7 +281,6 @@ class BrasiliaService:
             url = sanitized['url']
             if 'username=' in url and 'password=' in url:
                 # Reemplazar credenciales en la URL
-                import re
                 url = re.sub(r'username=[^&]+', 'username=[USUARIO_OCULTO]', url)
                 url = re.sub(r'password=[^&]+', 'password=[PASSWORD_OCULTO]', url)
                 sanitized['url'] = url
@@ -248,7 +307,9 @@ class BrasiliaService:
             return {
                 'status': 'success',
                 'request': json.dumps(sanitized_request, indent=2),
-                'response': json.dumps(result['response'], indent=2)
+                # Resumida antes de serializar: nunca se formatea la respuesta completa
+                'response': self.evidence.render(result['response']),
+                'login': self.token_cache.health()
             }
         else:
             # Sanitizar datos antes de enviar al frontend
@@ -257,6 +318,7 @@ class BrasiliaService:
             return {
                 'status': 'error',
                 'request': json.dumps(sanitized_request, indent=2) if sanitized_request else '',
-                'response': json.dumps(result['response'], indent=2) if 'response' in result else '',
-                'error': result['error']
+                'response': self.evidence.render(result['response']) if 'response' in result else '',
+                'error': result['error'],
+                'login': self.token_cache.health()
             }
\ No newline at end of file
@@ -0,0 +1,55 @@
+import json
+from typing import Any
+
+
+class EvidencePolicy:
+    """Límite de la evidencia (request/response) guardada por verificación.
+
+    La respuesta se resume antes de serializarla: de cada lista se conservan
+    los primeros `max_items` elementos más un marcador con la cantidad total
+    y la omitida, y los textos largos se recortan dejando el inicio y el
+    final. Si el JSON resultante supera `max_bytes` se reduce la cantidad de
+    elementos por lista y, como último recurso, se recorta el texto completo.
+    Así nunca se formatea con `indent=2` una respuesta de varios megabytes.
+    """
+
+    def __init__(self, max_bytes: int, max_items: int, max_string_chars: int):
+        self.max_bytes = max_bytes
+        self.max_items = max(1, max_items)
+        self.max_string_chars = max_string_chars
+
+    def render(self, value: Any) -> str:
+        """Serializa `value` dentro del presupuesto de bytes"""
+        max_items = self.max_items
+        while True:
+            # ensure_ascii (por defecto): la cantidad de caracteres es la de bytes
+            text = json.dumps(self.summarize(value, max_items), indent=2)
+            if len(text) <= self.max_bytes or max_items == 1:
+                return truncate_text(text, self.max_bytes)
+            max_items //= 2
+
+    def summarize(self, value: Any, max_items: int = None) -> Any:
+        """Copia de `value` con las listas y los textos largos acotados"""
+        if max_items is None:
+            max_items = self.max_items
+        if isinstance(value, dict):
+            return {key: self.summarize(item, max_items) for key, item in value.items()}
+        if isinstance(value, list):
+            items = [self.summarize(item, max_items) for item in value[:max_items]]
+            if len(value) > max_items:
+                items.append({'_omitted_items': len(value) - max_items, '_total_items': len(value)})
+            return items
+        if isinstance(value, str):
+            return truncate_text(value, self.max_string_chars)
+        return value
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """Recorta `text` a `max_chars` caracteres conservando inicio y final"""
+    if len(text) <= max_chars:
+        return text
+    marker = f'\n… [{len(text)} caracteres, recortado] …\n'
+    keep = max(0, max_chars - len(marker))
+    head = keep - keep // 4
+    tail = keep - head
+    return text[:head] + marker + (text[-tail:] if tail else '')
@@ -0,0 +1,104 @@
+import socket
+import ssl
+import threading
+from typing import Dict, Tuple
+from urllib.parse import urlsplit
+import sys
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+# Agregar el directorio padre al path para importar config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """Adaptador HTTP con pool de conexiones y TCP keep-alive activado"""
+
+    def __init__(self, keepalive_seconds: int = 60, **kwargs):
+        self.keepalive_seconds = keepalive_seconds
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        socket_options = list(HTTPConnection.default_socket_options)
+        socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        # Las opciones finas de keep-alive no existen en todas las plataformas
+        if hasattr(socket, 'TCP_KEEPIDLE'):
+            socket_options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, self.keepalive_seconds))
+        if hasattr(socket, 'TCP_KEEPINTVL'):
+            socket_options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, self.keepalive_seconds // 4)))
+        kwargs['socket_options'] = socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def create_session() -> requests.Session:
+    """Crea una sesión HTTP con pool de conexiones reutilizables"""
+    session = requests.Session()
+    adapter = KeepAliveAdapter(
+        keepalive_seconds=Config.HTTP_TCP_KEEPALIVE_SECONDS,
+        pool_connections=Config.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+        max_retries=0
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Connection'] = 'keep-alive'
+    return session
+
+
+def get_session(name: str) -> requests.Session:
+    """Obtiene la sesión compartida de un servicio, creándola si no existe"""
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = create_session()
+            _sessions[name] = session
+        return session
+
+
+def get_timeout() -> Tuple[float, float]:
+    """Retorna el timeout (conexión, lectura) configurado para las peticiones"""
+    return (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+
+
+def read_capped_text(response: requests.Response, max_bytes: int) -> str:
+    """Lee como mucho `max_bytes` del cuerpo de una respuesta con `stream=True`"""
+    body = bytearray()
+    for chunk in response.iter_content(chunk_size=min(max_bytes, 16 * 1024) or 1):
+        body += chunk[:max_bytes - len(body)]
+        if len(body) >= max_bytes:
+            break
+    return body.decode(response.encoding or 'utf-8', 'ignore')
+
+
+def check_connectivity(url: str, timeout: float) -> Tuple[bool, str]:
+    """Comprobación barata del host de `url`: conexión TCP y, si es https, handshake TLS.
+
+    No envía ninguna petición HTTP (ni login ni consulta). Retorna
+    (éxito, error).
+    """
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    try:
+        with socket.create_connection((parts.hostname, port), timeout=timeout) as sock:
+            if parts.scheme == 'https':
+                context = ssl.create_default_context()
+                with context.wrap_socket(sock, server_hostname=parts.hostname):
+                    pass
+        return True, ''
+    except (OSError, ValueError) as e:
+        return False, str(e)
+
+
+def close_sessions():
+    """Cierra todas las sesiones y sus conexiones abiertas"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,121 @@
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """Extrae el claim `exp` (epoch en segundos) de un JWT, sin verificar la firma"""
+    parts = token.split('.') if isinstance(token, str) else []
+    if len(parts) != 3:
+        return None
+    try:
+        payload = parts[1] + '=' * (-len(parts[1]) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        exp = claims.get('exp') if isinstance(claims, dict) else None
+        return float(exp) if exp is not None else None
+    except (ValueError, TypeError):
+        return None
+
+
+class TokenCache:
+    """Caché de token con control de vencimiento y estado del login.
+
+    El vencimiento se toma del claim `exp` cuando el token es un JWT y, en
+    caso contrario, de un TTL configurable. El token se considera vencido
+    `refresh_margin_seconds` antes de su vencimiento real para renovarlo de
+    forma anticipada.
+    """
+
+    def __init__(self, ttl_seconds: float = 1800, refresh_margin_seconds: float = 60):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._lock = threading.Lock()
+        # Quien inicia sesión lo hace con este lock tomado; los demás esperan
+        # y reutilizan el token nuevo en lugar de pedir otro
+        self.login_lock = threading.Lock()
+        self._token = None
+        self._cookies: Dict[str, str] = {}
+        self._expires_at = None
+        self._login = {
+            'status': 'unknown',
+            'last_attempt': None,
+            'last_success': None,
+            'error': '',
+            'logins': 0
+        }
+
+    def get(self) -> Optional[str]:
+        """Retorna el token vigente o None si debe renovarse"""
+        with self._lock:
+            if self._token and time.time() < self._expires_at - self.refresh_margin_seconds:
+                return self._token
+            return None
+
+    def cookies(self) -> Dict[str, str]:
+        """Cookies de sesión obtenidas junto con el token vigente"""
+        with self._lock:
+            return dict(self._cookies)
+
+    def store(self, token: str, cookies: Optional[Dict[str, str]] = None):
+        """Guarda un token nuevo (y sus cookies de sesión) calculando su vencimiento"""
+        expires_at = jwt_expiry(token) or time.time() + self.ttl_seconds
+        with self._lock:
+            self._token = token
+            self._cookies = dict(cookies or {})
+            self._expires_at = expires_at
+
+    def invalidate(self, token: Optional[str] = None):
+        """Descarta el token actual (por ejemplo, tras un HTTP 401).
+
+        Si se indica `token`, solo se descarta si sigue siendo el vigente: un
+        401 tardío no borra el token que otro servicio acaba de renovar.
+        """
+        with self._lock:
+            if token is not None and token != self._token:
+                return
+            self._token = None
+            self._cookies = {}
+            self._expires_at = None
+
+    def record_login(self, success: bool, error: str = ''):
+        """Registra el resultado de un intento de login"""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            self._login['status'] = 'success' if success else 'error'
+            self._login['last_attempt'] = now
+            self._login['error'] = '' if success else error
+            self._login['logins'] += 1
+            if success:
+                self._login['last_success'] = now
+
+    def health(self) -> Dict[str, Any]:
+        """Estado del login y del token en caché"""
+        with self._lock:
+            health = dict(self._login)
+            health['token_cached'] = self._token is not None
+            health['token_expires_at'] = (
+                datetime.fromtimestamp(self._expires_at).isoformat(timespec='seconds')
+                if self._expires_at else None
+            )
+            return health
+
+
+_shared_caches: Dict[Tuple, TokenCache] = {}
+_shared_caches_lock = threading.Lock()
+
+
+def shared_token_cache(scope: Tuple, ttl_seconds: float = 1800,
+                       refresh_margin_seconds: float = 60) -> TokenCache:
+    """Caché de token compartida por los servicios del mismo `scope`.
+
+    `scope` identifica backend y credenciales; los servicios que lo comparten
+    inician sesión una sola vez y reutilizan el mismo token y cookies.
+    """
+    with _shared_caches_lock:
+        cache = _shared_caches.get(scope)
+        if cache is None:
+            cache = _shared_caches[scope] = TokenCache(ttl_seconds, refresh_margin_seconds)
+        return cache
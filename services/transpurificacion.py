@@ -1,6 +1,6 @@
-import requests
 import json
 import xml.etree.ElementTree as ET
+from xml.parsers import expat
 from datetime import datetime
 from typing import Dict, Any
 import sys
@@ -9,6 +9,16 @@ import os
 # Agregar el directorio padre al path para importar config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config
+from services.http_client import get_session, get_timeout, read_capped_text
+from services.token_cache import TokenCache
+from services.evidence import EvidencePolicy
+from services.xml_stream import InnerXMLError, TripStreamParser
+
+# Atributos que debe tener cada viaje (se validan en el primero)
+REQUIRED_VIAJE_ATTRS = ['TerminalOrigenNombre', 'TerminalDestinoNombre', 'FechaPartida', 'ButacasDisponibles']
+
+# Tamaño de los bloques leídos de la respuesta de viajes
+XML_READ_CHUNK_BYTES = 16 * 1024
 
 class TranspurificacionService:
     def __init__(self):
@@ -20,6 +30,9 @@ class TranspurificacionService:
         self.key = service_config.get('key')
         self.consumer_id = service_config.get('consumer_id')
         self.token = None
+        self.session = get_session('transpurificacion')
+        self.token_cache = TokenCache(Config.TOKEN_TTL_SECONDS, Config.TOKEN_REFRESH_MARGIN_SECONDS)
+        self.evidence = EvidencePolicy(**Config.get_evidence_config('transpurificacion'))
         
     def get_token(self) -> Dict[str, Any]:
         """Obtiene el token de autenticación usando SOAP"""
@@ -41,7 +54,7 @@ class TranspurificacionService:
 </soap:Envelope>'''
         
         try:
-            response = requests.post(url, headers=headers, data=soap_body, timeout=30)
+            response = self.session.post(url, headers=headers, data=soap_body, timeout=get_timeout())
             request_data = {
                 "url": url,
                 "method": "POST",
@@ -128,10 +141,23 @@ class TranspurificacionService:
                 'response': ''
             }
     
-    def check_trips_api(self) -> Dict[str, Any]:
-        """Verifica la API de viajes disponibles usando SOAP"""
-        # Siempre obtener un token nuevo para evitar problemas de vencimiento
+    def ensure_token(self) -> Dict[str, Any]:
+        """Reutiliza el token en caché o inicia sesión si está por vencer"""
+        cached_token = self.token_cache.get()
+        if cached_token:
+            self.token = cached_token
+            return {'success': True, 'token': cached_token, 'cached': True}
+        
         token_result = self.get_token()
+        self.token_cache.record_login(token_result['success'], token_result.get('error', ''))
+        if token_result['success']:
+            self.token_cache.store(self.token)
+        return token_result
+    
+    def check_trips_api(self, retry_on_unauthorized: bool = True) -> Dict[str, Any]:
+        """Verifica la API de viajes disponibles usando SOAP"""
+        # Reutilizar el token mientras siga vigente
+        token_result = self.ensure_token()
         if not token_result['success']:
             return token_result
         
@@ -164,7 +190,15 @@ class TranspurificacionService:
 </soap:Envelope>'''
         
         try:
-            response = requests.post(url, headers=headers, data=soap_body, timeout=30)
+            # La respuesta se lee por bloques: puede traer todos los viajes del día
+            response = self.session.post(url, headers=headers, data=soap_body,
+                                         timeout=get_timeout(), stream=True)
+            
+            if response.status_code == 401 and retry_on_unauthorized:
+                # Token rechazado: descartarlo y reintentar una vez con login nuevo
+                response.close()
+                self.token_cache.invalidate()
+                return self.check_trips_api(retry_on_unauthorized=False)
             
             request_data = {
                 "url": url,
@@ -173,100 +207,18 @@ class TranspurificacionService:
                 "body": soap_body
             }
             
-            if response.status_code == 200:
-                try:
-                    # Parsear respuesta XML SOAP
-                    root = ET.fromstring(response.text)
-                    
-                    # Namespaces para SOAP
-                    namespaces = {
-                        'soap': 'http://www.w3.org/2003/05/soap-envelope',
-                        'agil': 'http://agilis.fics.fsl.sisorg.com.ar/'
-                    }
-                    
-                    # Buscar GetDisponiblesIdaResult
-                    result_element = root.find('.//agil:GetDisponiblesIdaResult', namespaces)
-                    if result_element is not None and result_element.text:
-                        # El contenido está como XML anidado en texto
-                        inner_xml = result_element.text
-                        
-                        try:
-                            # Parsear el XML interno
-                            inner_root = ET.fromstring(inner_xml)
-                            
-                            # Buscar elementos viaje
-                            viajes = inner_root.findall('.//viaje')
-                            
-                            if viajes:
-                                # Verificar que al menos haya elementos viaje con atributos básicos
-                                first_viaje = viajes[0]
-                                required_attrs = ['TerminalOrigenNombre', 'TerminalDestinoNombre', 'FechaPartida', 'ButacasDisponibles']
-                                
-                                if all(attr in first_viaje.attrib for attr in required_attrs):
-                                    return {
-                                        'success': True,
-                                        'request': request_data,
-                                        'response': {
-                                            'xml_response': response.text,
-                                            'parsed_data': {
-                                                'total_viajes': len(viajes),
-                                                'fecha_consulta': current_date,
-                                                'primer_viaje': dict(first_viaje.attrib)
-                                            }
-                                        }
-                                    }
-                                else:
-                                    missing_attrs = [attr for attr in required_attrs if attr not in first_viaje.attrib]
-                                    return {
-                                        'success': False,
-                                        'error': f'Missing required attributes in viaje: {missing_attrs}. Available: {list(first_viaje.attrib.keys())}',
-                                        'request': request_data,
-                                        'response': response.text
-                                    }
-                            else:
-                                # No hay viajes disponibles pero la estructura es válida
-                                return {
-                                    'success': True,
-                                    'request': request_data,
-                                    'response': {
-                                        'xml_response': response.text,
-                                        'parsed_data': {
-                                            'total_viajes': 0,
-                                            'fecha_consulta': current_date,
-                                            'mensaje': 'No hay viajes disponibles para la fecha consultada'
-                                        }
-                                    }
-                                }
-                                
-                        except ET.ParseError as e:
-                            return {
-                                'success': False,
-                                'error': f'Error parsing inner XML: {str(e)}',
-                                'request': request_data,
-                                'response': response.text
-                            }
-                    else:
-                        return {
-                            'success': False,
-                            'error': 'GetDisponiblesIdaResult not found in SOAP response',
-                            'request': request_data,
-                            'response': response.text
-                        }
-                        
-                except ET.ParseError as e:
-                    return {
-                        'success': False,
-                        'error': f'Error parsing SOAP XML: {str(e)}',
-                        'request': request_data,
-                        'response': response.text
-                    }
-            else:
+            try:
+                if response.status_code == 200:
+                    return self._parse_trips_response(response, request_data, current_date)
+                
                 return {
                     'success': False,
                     'error': f'HTTP {response.status_code}',
                     'request': request_data,
-                    'response': response.text
+                    'response': read_capped_text(response, self.evidence.max_string_chars)
                 }
+            finally:
+                response.close()
                 
         except Exception as e:
             return {
@@ -281,6 +233,82 @@ class TranspurificacionService:
                 'response': ''
             }
     
+    def _parse_trips_response(self, response, request_data: Dict[str, Any],
+                              current_date: str) -> Dict[str, Any]:
+        """Valida la respuesta de viajes a medida que se descarga.
+        
+        No se construye el árbol XML (ni del sobre SOAP ni del XML interno):
+        se cuentan los `viaje`, se validan los atributos del primero y se deja
+        de leer en cuanto falta alguno. Como evidencia se guardan tantos bytes
+        del inicio de la respuesta como admite la política de evidencia para
+        un texto (`max_string_chars`).
+        """
+        parser = TripStreamParser('GetDisponiblesIdaResult', REQUIRED_VIAJE_ATTRS,
+                                  self.evidence.max_string_chars)
+        try:
+            complete = True
+            for chunk in response.iter_content(chunk_size=XML_READ_CHUNK_BYTES):
+                if not parser.feed(chunk):
+                    complete = False
+                    break
+            if complete:
+                parser.close()
+        except InnerXMLError as e:
+            return {
+                'success': False,
+                'error': f'Error parsing inner XML: {str(e)}',
+                'request': request_data,
+                'response': parser.evidence_text()
+            }
+        except expat.ExpatError as e:
+            return {
+                'success': False,
+                'error': f'Error parsing SOAP XML: {str(e)}',
+                'request': request_data,
+                'response': parser.evidence_text()
+            }
+        
+        if parser.missing_attrs is not None:
+            return {
+                'success': False,
+                'error': f'Missing required attributes in viaje: {parser.missing_attrs}. Available: {list(parser.first_viaje.keys())}',
+                'request': request_data,
+                'response': parser.evidence_text()
+            }
+        
+        if not parser.has_result:
+            return {
+                'success': False,
+                'error': 'GetDisponiblesIdaResult not found in SOAP response',
+                'request': request_data,
+                'response': parser.evidence_text()
+            }
+        
+        if parser.total_viajes:
+            parsed_data = {
+                'total_viajes': parser.total_viajes,
+                'fecha_consulta': current_date,
+                'primer_viaje': parser.first_viaje
+            }
+        else:
+            # No hay viajes disponibles pero la estructura es válida
+            parsed_data = {
+                'total_viajes': 0,
+                'fecha_consulta': current_date,
+                'mensaje': 'No hay viajes disponibles para la fecha consultada'
+            }
+        
+        return {
+            'success': True,
+            'request': request_data,
+            'response': {
+                'xml_response': parser.evidence_text(),
+                'xml_response_bytes': parser.total_bytes,
+                'xml_truncated': parser.truncated,
+                'parsed_data': parsed_data
+            }
+        }
+    
     def sanitize_request_data(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
         """Elimina datos sensibles del request antes de enviarlo al frontend"""
         sanitized = request_data.copy()
@@ -310,7 +338,9 @@ class TranspurificacionService:
             return {
                 'status': 'success',
                 'request': json.dumps(sanitized_request, indent=2),
-                'response': json.dumps(result['response'], indent=2)
+                # Resumida antes de serializar: nunca se formatea la respuesta completa
+                'response': self.evidence.render(result['response']),
+                'login': self.token_cache.health()
             }
         else:
             # Sanitizar datos antes de enviar al frontend
@@ -319,6 +349,7 @@ class TranspurificacionService:
             return {
                 'status': 'error',
                 'request': json.dumps(sanitized_request, indent=2) if sanitized_request else '',
-                'response': json.dumps(result['response'], indent=2) if 'response' in result else '',
-                'error': result['error']
+                'response': self.evidence.render(result['response']) if 'response' in result else '',
+                'error': result['error'],
+                'login': self.token_cache.health()
             }
\ No newline at end of file
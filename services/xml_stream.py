@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional
+from xml.parsers import expat
+
+# Espacio de nombres de los servicios SOAP de Agilis (Transpurificación)
+AGIL_NAMESPACE = 'http://agilis.fics.fsl.sisorg.com.ar/'
+
+# Tamaño del búfer de texto de expat: el XML interno llega en bloques grandes
+# en lugar de un llamado por cada entidad (&lt;, &gt;) escapada
+TEXT_BUFFER_BYTES = 64 * 1024
+
+
+class InnerXMLError(Exception):
+    """Error de sintaxis en el XML interno (el contenido del resultado SOAP)"""
+
+
+class TripStreamParser:
+    """Lee la respuesta de `GetDisponiblesIda` por bloques sin construir árboles.
+
+    El sobre SOAP se recorre con expat y el texto de `<result_tag>` (que
+    trae otro documento XML escapado) se pasa a un segundo parser a medida
+    que llega. Del XML interno solo se cuentan los elementos `viaje` y se
+    validan los atributos del primero; si faltan, `feed` retorna False para
+    que el llamador deje de leer. De la respuesta cruda se conservan como
+    mucho `max_evidence_bytes`.
+    """
+
+    def __init__(self, result_tag: str, required_attrs: List[str], max_evidence_bytes: int):
+        self.result_tag = f'{AGIL_NAMESPACE} {result_tag}'
+        self.required_attrs = required_attrs
+        self.max_evidence_bytes = max_evidence_bytes
+        self.evidence = bytearray()
+        self.total_bytes = 0
+        self.found_result = False
+        self.total_viajes = 0
+        self.first_viaje: Optional[Dict[str, str]] = None
+        self.missing_attrs: Optional[List[str]] = None
+
+        self._in_result = False
+        self._inner = None
+        self._inner_started = False
+        self._outer = expat.ParserCreate(namespace_separator=' ')
+        self._outer.buffer_text = True
+        self._outer.buffer_size = TEXT_BUFFER_BYTES
+        self._outer.StartElementHandler = self._outer_start
+        self._outer.EndElementHandler = self._outer_end
+        self._outer.CharacterDataHandler = self._outer_text
+
+    def feed(self, chunk: bytes) -> bool:
+        """Procesa un bloque de la respuesta; False si ya no hace falta seguir"""
+        self.total_bytes += len(chunk)
+        room = self.max_evidence_bytes - len(self.evidence)
+        if room > 0:
+            self.evidence += chunk[:room]
+        self._outer.Parse(chunk, False)
+        return self.missing_attrs is None
+
+    def close(self):
+        """Termina el documento; lanza `expat.ExpatError` si quedó incompleto"""
+        self._outer.Parse(b'', True)
+
+    @property
+    def has_result(self) -> bool:
+        """Se encontró el resultado y traía contenido"""
+        return self.found_result and self._inner_started
+
+    def evidence_text(self) -> str:
+        """Inicio de la respuesta cruda como texto (corta sin partir caracteres)"""
+        return self.evidence.decode('utf-8', 'ignore')
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > len(self.evidence)
+
+    def _outer_start(self, name: str, attrs: Dict[str, str]):
+        if name == self.result_tag and not self.found_result:
+            self.found_result = True
+            self._in_result = True
+            self._inner = expat.ParserCreate()
+            self._inner.StartElementHandler = self._inner_start
+
+    def _outer_end(self, name: str):
+        if name == self.result_tag and self._in_result:
+            self._in_result = False
+            if self._inner_started and self.missing_attrs is None:
+                self._parse_inner('', True)
+
+    def _outer_text(self, data: str):
+        if not self._in_result or self.missing_attrs is not None:
+            return
+        if not self._inner_started:
+            # Un resultado vacío o solo con espacios se trata como ausente
+            if not data.strip():
+                return
+            self._inner_started = True
+        self._parse_inner(data, False)
+
+    def _parse_inner(self, data: str, final: bool):
+        try:
+            self._inner.Parse(data, final)
+        except expat.ExpatError as e:
+            raise InnerXMLError(str(e)) from e
+
+    def _inner_start(self, name: str, attrs: Dict[str, str]):
+        if name != 'viaje':
+            return
+        self.total_viajes += 1
+        if self.first_viaje is None:
+            self.first_viaje = attrs
+            missing = [attr for attr in self.required_attrs if attr not in attrs]
+            if missing:
+                self.missing_attrs = missing
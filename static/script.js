@@ -1,9 +1,17 @@
+// Duración de cada segmento de la línea de tiempo (5 minutos)
+const SLOT_MS = 5 * 60 * 1000;
+
 class ServiceMonitor {
     constructor() {
         this.services = [];
         this.updateInterval = 30000; // 30 segundos
         this.modal = document.getElementById('modal-overlay');
         this.currentSegmentData = null;
+        this.pendingProbeId = null;
+        this.cursor = null; // id de la última verificación recibida
+        this.timelines = {}; // segmentos acumulados por servicio
+        this.eventSource = null;
+        this.pollTimer = null;
         this.init();
     }
 
@@ -16,11 +24,9 @@ class ServiceMonitor {
         // Crear segmentos de tiempo para cada servicio
         this.createTimeSegments();
 
-        // Cargar datos iniciales
-        this.loadAllData();
-
-        // Configurar actualización automática
-        setInterval(() => this.loadAllData(), this.updateInterval);
+        // Cargar datos iniciales y luego recibir las novedades por el stream
+        // (con polling como respaldo si el stream no está disponible)
+        this.loadAllData().then(() => this.connectStream());
 
         // Configurar eventos del modal
         this.setupModalEvents();
@@ -52,17 +58,111 @@ class ServiceMonitor {
 
     async loadAllData() {
         try {
-            const response = await fetch('/api/data');
+            // Tras la primera carga solo se piden las verificaciones nuevas
+            const since = this.cursor;
+            const isFullLoad = since === null;
+            const url = isFullLoad ? '/api/timeline' : `/api/timeline?since=${since}`;
+            const response = await fetch(url);
             const data = await response.json();
+            const cursor = parseInt(response.headers.get('X-Data-Cursor'), 10);
             
             this.services.forEach(service => {
-                this.updateServiceDisplay(service, data[service] || {});
+                this.mergeServiceData(service, data[service] || {}, isFullLoad);
+                this.updateServiceDisplay(service, this.timelines[service]);
             });
+
+            if (Number.isNaN(cursor) || (!isFullLoad && cursor < since)) {
+                // Cursor ausente o reiniciado (base de datos nueva): recargar todo
+                this.cursor = null;
+            } else {
+                // El stream pudo haber avanzado el cursor mientras se consultaba
+                this.cursor = Math.max(cursor, this.cursor || 0);
+            }
         } catch (error) {
             console.error('Error loading data:', error);
         }
     }
 
+    mergeServiceData(service, serviceData, replace) {
+        if (replace || !this.timelines[service]) {
+            this.timelines[service] = {};
+        }
+        const timeline = this.timelines[service];
+
+        // Las claves son segmentos absolutos de 5 minutos (epoch / 300 s);
+        // las verificaciones nuevas reemplazan a las anteriores en el mismo segmento
+        Object.entries(serviceData).forEach(([slotNumber, slot]) => {
+            const current = timeline[slotNumber];
+            if (!current || slot.timestamp >= current.timestamp) {
+                timeline[slotNumber] = slot;
+            }
+        });
+
+        // Descartar segmentos que ya salieron de la ventana de 24 horas
+        const cutoffSlot = Math.floor((Date.now() - 24 * 60 * 60 * 1000) / SLOT_MS);
+        Object.keys(timeline).forEach(slotNumber => {
+            if (Number(slotNumber) < cutoffSlot) {
+                delete timeline[slotNumber];
+            }
+        });
+    }
+
+    slotTime(slotNumber) {
+        // Hora local (HH:MM) de inicio de un segmento absoluto
+        const date = new Date(Number(slotNumber) * SLOT_MS);
+        return `${date.getHours().toString().padStart(2, '0')}:${date.getMinutes().toString().padStart(2, '0')}`;
+    }
+
+    connectStream() {
+        if (!window.EventSource) {
+            this.startPolling();
+            return;
+        }
+
+        // Reanudar desde la última verificación cargada para no perder eventos
+        const url = this.cursor !== null ? `/api/stream?last_event_id=${this.cursor}` : '/api/stream';
+        this.eventSource = new EventSource(url);
+
+        this.eventSource.addEventListener('open', () => this.stopPolling());
+        this.eventSource.addEventListener('probe', (event) => {
+            this.handleProbeEvent(JSON.parse(event.data));
+        });
+        this.eventSource.addEventListener('reset', () => {
+            // El servidor ya no tiene los eventos perdidos: recargar todo
+            this.cursor = null;
+            this.loadAllData();
+        });
+        // El navegador reintenta la conexión solo; mientras tanto, consultar periódicamente
+        this.eventSource.addEventListener('error', () => this.startPolling());
+    }
+
+    startPolling() {
+        if (!this.pollTimer) {
+            this.pollTimer = setInterval(() => this.loadAllData(), this.updateInterval);
+        }
+    }
+
+    stopPolling() {
+        if (this.pollTimer) {
+            clearInterval(this.pollTimer);
+            this.pollTimer = null;
+        }
+    }
+
+    handleProbeEvent(probe) {
+        const service = probe.service_name;
+        const slots = {};
+        probe.slots.forEach(slotNumber => {
+            slots[slotNumber] = { id: probe.id, status: probe.status, timestamp: probe.timestamp };
+        });
+
+        this.mergeServiceData(service, slots, false);
+        if (this.services.includes(service)) {
+            this.updateServiceDisplay(service, this.timelines[service]);
+        }
+        this.cursor = Math.max(this.cursor || 0, probe.id);
+    }
+
     updateServiceDisplay(service, serviceData) {
         // Actualizar indicador de estado
         const statusIndicator = document.getElementById(`status-${service}`);
@@ -78,9 +178,7 @@ class ServiceMonitor {
             // Ordenar por timestamp real (más reciente primero)
             lastTime = times.reduce((latest, current) => {
                 if (!latest) return current;
-                const latestTimestamp = new Date(serviceData[latest].timestamp);
-                const currentTimestamp = new Date(serviceData[current].timestamp);
-                return currentTimestamp > latestTimestamp ? current : latest;
+                return serviceData[current].timestamp > serviceData[latest].timestamp ? current : latest;
             });
             lastStatus = serviceData[lastTime].status;
         }
@@ -102,29 +200,38 @@ class ServiceMonitor {
             lastUpdateElement.textContent = 'Sin datos';
         }
 
+        // Ubicar cada segmento absoluto en su hora del día; si la ventana
+        // contiene dos segmentos con la misma hora gana el más reciente
+        const byTime = {};
+        Object.keys(serviceData).forEach(slotNumber => {
+            const time = this.slotTime(slotNumber);
+            if (!byTime[time] || Number(slotNumber) > byTime[time].slotNumber) {
+                byTime[time] = { slotNumber: Number(slotNumber), data: serviceData[slotNumber] };
+            }
+        });
+
         // Actualizar segmentos de tiempo
         const segments = timeBar.querySelectorAll('.time-segment');
         const now = new Date();
         const today = new Date(now.getFullYear(), now.getMonth(), now.getDate());
         
         segments.forEach(segment => {
-            const time = segment.dataset.time;
-            if (serviceData[time]) {
-                const timestamp = new Date(serviceData[time].timestamp);
+            const entry = byTime[segment.dataset.time];
+            if (entry) {
+                const slot = entry.data;
+                const timestamp = new Date(slot.timestamp);
                 const segmentDate = new Date(timestamp.getFullYear(), timestamp.getMonth(), timestamp.getDate());
                 
                 // Determinar si es de hoy o de ayer
                 const isToday = segmentDate.getTime() === today.getTime();
                 const dateClass = isToday ? 'today' : 'yesterday';
                 
-                segment.className = `time-segment ${serviceData[time].status} ${dateClass}`;
+                segment.className = `time-segment ${slot.status} ${dateClass}`;
                 segment.dataset.hasData = 'true';
                 
-                // Guardar datos para el tooltip
-                segment.dataset.timestamp = serviceData[time].timestamp;
-                segment.dataset.request = serviceData[time].request;
-                segment.dataset.response = serviceData[time].response;
-                segment.dataset.error = serviceData[time].error || '';
+                // Guardar referencia a la verificación; el detalle se carga al hacer click
+                segment.dataset.timestamp = slot.timestamp;
+                segment.dataset.probeId = slot.id;
             } else {
                 segment.className = 'time-segment no-data';
                 segment.dataset.hasData = 'false';
@@ -149,16 +256,58 @@ class ServiceMonitor {
         });
     }
 
-    showModal(segment) {
+    async showModal(segment) {
         const time = segment.dataset.time;
         const timestamp = segment.dataset.timestamp;
-        const request = segment.dataset.request;
-        const response = segment.dataset.response;
-        const error = segment.dataset.error;
+        const probeId = segment.dataset.probeId;
         const service = segment.dataset.service;
         const status = segment.classList.contains('success') ? 'success' : 'error';
         const statusText = status === 'success' ? 'Éxito' : 'Error';
 
+        // Actualizar contenido del modal - formatear nombre del servicio
+        const formattedServiceName = service.replace(/_/g, ' ').replace(/\b\w/g, l => l.toUpperCase());
+        document.getElementById('modal-service-name').textContent = formattedServiceName;
+        document.getElementById('modal-time').textContent = `${time}`;
+        
+        const statusBadge = document.getElementById('modal-status');
+        statusBadge.textContent = statusText;
+        statusBadge.className = `status-badge ${status}`;
+        
+        const requestElement = document.getElementById('modal-request');
+        const responseElement = document.getElementById('modal-response');
+        const errorSection = document.getElementById('modal-error');
+        requestElement.textContent = 'Cargando...';
+        responseElement.textContent = 'Cargando...';
+        errorSection.style.display = 'none';
+        this.currentSegmentData = null;
+        this.pendingProbeId = probeId;
+
+        // Mostrar modal
+        this.modal.classList.add('show');
+        document.body.style.overflow = 'hidden'; // Prevenir scroll del body
+
+        // Cargar el detalle de la verificación bajo demanda
+        let probe;
+        try {
+            const response = await fetch(`/api/probe/${probeId}`);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            probe = await response.json();
+        } catch (error) {
+            console.error('Error loading probe detail:', error);
+            requestElement.textContent = '';
+            responseElement.textContent = `No se pudo cargar el detalle: ${error.message}`;
+            return;
+        }
+
+        // El usuario pudo cerrar el modal o abrir otro segmento mientras cargaba
+        if (!this.modal.classList.contains('show') || this.pendingProbeId !== probeId) {
+            return;
+        }
+
+        const { request, response, error } = probe;
+
         // Guardar datos actuales para la función de copiar
         this.currentSegmentData = {
             time,
@@ -169,29 +318,15 @@ class ServiceMonitor {
             timestamp
         };
 
-        // Actualizar contenido del modal - formatear nombre del servicio
-        const formattedServiceName = service.replace(/_/g, ' ').replace(/\b\w/g, l => l.toUpperCase());
-        document.getElementById('modal-service-name').textContent = formattedServiceName;
-        document.getElementById('modal-time').textContent = `${time}`;
-        
-        const statusBadge = document.getElementById('modal-status');
-        statusBadge.textContent = statusText;
-        statusBadge.className = `status-badge ${status}`;
+        requestElement.textContent = this.formatJson(request);
+        responseElement.textContent = this.formatJson(response);
         
-        document.getElementById('modal-request').textContent = this.formatJson(request);
-        document.getElementById('modal-response').textContent = this.formatJson(response);
-        
-        const errorSection = document.getElementById('modal-error');
         if (error && error.trim()) {
             errorSection.querySelector('.error-content').textContent = error;
             errorSection.style.display = 'block';
         } else {
             errorSection.style.display = 'none';
         }
-
-        // Mostrar modal
-        this.modal.classList.add('show');
-        document.body.style.overflow = 'hidden'; // Prevenir scroll del body
     }
 
     closeModal() {
@@ -212,7 +347,7 @@ class ServiceMonitor {
 
     formatTimestamp(timestamp) {
         try {
-            const date = new Date(timestamp);
+            const date = new Date(Number(timestamp));
             const now = new Date();
             const today = new Date(now.getFullYear(), now.getMonth(), now.getDate());
             const timestampDate = new Date(date.getFullYear(), date.getMonth(), date.getDate());
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el circuito por servicio y la comprobación de conexión
+"""
+
+import socket
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from services.http_client import check_connectivity
+
+def test_circuit_breaker():
+    """Prueba apertura, comprobaciones con el circuito abierto y recuperación"""
+    print("🔍 Probando circuito por servicio...")
+
+    # Test 1: Se abre tras los errores seguidos configurados
+    print("\n📝 Test 1: Apertura tras errores seguidos...")
+    breaker = CircuitBreaker(failure_threshold=3, recovery_prechecks=2)
+    breaker.record_result(False, 'timeout')
+    breaker.record_result(True)
+    breaker.record_result(False, 'timeout')
+    breaker.record_result(False, 'timeout')
+    assert breaker.state == CLOSED and breaker.allow_probe()
+    breaker.record_result(False, 'HTTP 503')
+    assert breaker.state == OPEN and not breaker.allow_probe()
+    assert breaker.health()['last_error'] == 'HTTP 503'
+    print("  ✅ Abierto tras 3 errores seguidos (un éxito reinicia la cuenta)")
+
+    # Test 2: Las comprobaciones exitosas seguidas habilitan una verificación de prueba
+    print("\n📝 Test 2: Comprobaciones con el circuito abierto...")
+    reason = breaker.record_precheck(True)
+    assert 'Circuit open' in reason and 'HTTP 503' in reason and '1/2' in reason
+    breaker.record_precheck(False)
+    breaker.record_precheck(True)
+    assert breaker.state == OPEN
+    breaker.record_precheck(True)
+    assert breaker.state == HALF_OPEN and breaker.allow_probe()
+    print("  ✅ Una comprobación fallida reinicia la cuenta; 2 seguidas pasan a half_open")
+
+    # Test 3: La verificación de prueba cierra o vuelve a abrir el circuito
+    print("\n📝 Test 3: Verificación de prueba...")
+    breaker.record_result(False, 'HTTP 503')
+    assert breaker.state == OPEN and breaker.health()['prechecks_ok'] == 0
+    breaker.record_precheck(True)
+    breaker.record_precheck(True)
+    breaker.record_result(True)
+    assert breaker.state == CLOSED and breaker.health()['consecutive_failures'] == 0
+    disabled = CircuitBreaker(failure_threshold=0)
+    for _ in range(10):
+        disabled.record_result(False, 'timeout')
+    assert disabled.state == CLOSED
+    print("  ✅ Falla: vuelve a abrirse; éxito: se cierra; umbral 0 lo desactiva")
+
+    # Test 4: Comprobación de conexión contra un puerto abierto y uno cerrado
+    print("\n📝 Test 4: Comprobación de conexión TCP...")
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    port = server.getsockname()[1]
+    assert check_connectivity(f'http://127.0.0.1:{port}/api', timeout=2) == (True, '')
+    server.close()
+    reachable, error = check_connectivity(f'http://127.0.0.1:{port}/api', timeout=2)
+    assert not reachable and error
+    print(f"  ✅ Puerto cerrado detectado: {error}")
+
+    print("\n✅ Todos los tests completados exitosamente!")
+
+if __name__ == '__main__':
+    test_circuit_breaker()
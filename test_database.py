@@ -4,8 +4,10 @@ Script de prueba para verificar la funcionalidad de la base de datos SQLite
 """
 
 import json
+import os
+import sqlite3
 from datetime import datetime, timedelta
-from database import MonitoringDatabase
+from database import MonitoringDatabase, WriteBehindQueue, slot_for, to_epoch_ms
 
 def test_database():
     """Prueba las funciones principales de la base de datos"""
@@ -22,7 +24,6 @@ def test_database():
         {
             'service_name': 'bolivariano',
             'timestamp': now - timedelta(minutes=10),
-            'time_slot': '14:20',
             'status': 'success',
             'request_data': '{"test": "request"}',
             'response_data': '{"test": "response"}',
@@ -31,7 +32,6 @@ def test_database():
         {
             'service_name': 'bolivariano',
             'timestamp': now - timedelta(minutes=5),
-            'time_slot': '14:25',
             'status': 'error',
             'request_data': '{"test": "request2"}',
             'response_data': '',
@@ -40,7 +40,6 @@ def test_database():
         {
             'service_name': 'test_service',
             'timestamp': now,
-            'time_slot': '14:30',
             'status': 'success',
             'request_data': '{"test": "request3"}',
             'response_data': '{"test": "response3"}',
@@ -50,14 +49,14 @@ def test_database():
     
     for data in test_data:
         db.insert_monitoring_data(**data)
-        print(f"  ✅ Insertado: {data['service_name']} {data['time_slot']} {data['status']}")
+        print(f"  ✅ Insertado: {data['service_name']} {data['timestamp'].strftime('%H:%M')} {data['status']}")
     
     # Test 2: Consultar datos de un servicio
     print("\n📊 Test 2: Consultando datos de 'bolivariano'...")
     bolivariano_data = db.get_service_data_last_24h('bolivariano')
     print(f"  📈 Datos encontrados: {len(bolivariano_data)} registros")
-    for time_slot, data in bolivariano_data.items():
-        print(f"    {time_slot}: {data['status']}")
+    for slot, data in bolivariano_data.items():
+        print(f"    {slot}: {data['status']}")
     
     # Test 3: Consultar todos los servicios
     print("\n📊 Test 3: Consultando todos los servicios...")
@@ -75,14 +74,20 @@ def test_database():
     for service_name, service_stats in stats['services'].items():
         print(f"    {service_name}: {service_stats['total_records']} registros")
     
-    # Test 5: Limpieza de datos antiguos
-    print("\n🧹 Test 5: Probando limpieza de datos antiguos...")
+    # Test 5: Modo WAL activado
+    print("\n📊 Test 5: Verificando modo WAL...")
+    with db.connections.reader() as conn:
+        journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+    assert journal_mode == 'wal'
+    print(f"  ✅ journal_mode = {journal_mode}")
+    
+    # Test 6: Limpieza de datos antiguos
+    print("\n🧹 Test 6: Probando limpieza de datos antiguos...")
     # Insertar datos muy antiguos
     old_timestamp = now - timedelta(hours=50)
     db.insert_monitoring_data(
         service_name='old_service',
         timestamp=old_timestamp,
-        time_slot='10:00',
         status='success',
         request_data='{"old": "data"}',
         response_data='{"old": "response"}',
@@ -103,13 +108,249 @@ def test_database():
     stats_after = db.get_database_stats()
     print(f"  📊 Registros después de limpieza: {stats_after['total_records']}")
     
+    # Test 7: Escritura agrupada mediante la cola asíncrona
+    print("\n📝 Test 7: Probando cola de escritura agrupada...")
+    for minute in range(0, 30, 5):
+        db.enqueue_monitoring_data(
+            service_name='queued_service',
+            timestamp=now - timedelta(minutes=minute),
+            status='success'
+        )
+    assert db.flush_writes(timeout=5)
+    assert db.get_database_stats()['pending_writes'] == 0
+    queued_data = db.get_service_data_last_24h('queued_service')
+    assert len(queued_data) == 6
+    print(f"  ✅ {len(queued_data)} registros confirmados en un solo lote")
+    
+    # Test 8: Una fila por verificación expandida a los segmentos que cubre
+    print("\n📝 Test 8: Probando verificaciones de intervalo largo...")
+    db.insert_monitoring_data(
+        service_name='interval_service',
+        timestamp=now,
+        status='success',
+        interval_minutes=15
+    )
+    interval_data = db.get_service_data_last_24h('interval_service')
+    first_slot = slot_for(to_epoch_ms(now))
+    assert sorted(interval_data.keys()) == [first_slot, first_slot + 1, first_slot + 2]
+    assert db.get_database_stats()['services']['interval_service']['total_records'] == 1
+    print(f"  ✅ 1 registro almacenado, segmentos: {sorted(interval_data.keys())}")
+    
+    # Test 9: Línea de tiempo compacta y detalle bajo demanda
+    print("\n📊 Test 9: Probando línea de tiempo compacta...")
+    timeline = db.get_service_timeline_last_24h('bolivariano')
+    error_slot = slot_for(to_epoch_ms(now - timedelta(minutes=5)))
+    slot = timeline[error_slot]
+    assert slot['timestamp'] == to_epoch_ms(now - timedelta(minutes=5))
+    assert set(slot.keys()) == {'id', 'timestamp', 'status'}
+    probe = db.get_probe(slot['id'])
+    assert probe['error'] == 'Error de prueba'
+    assert db.get_probe(-1) is None
+    print(f"  ✅ Segmento {error_slot} -> verificación {slot['id']} ({probe['status']})")
+    
+    # Test 10: Consulta incremental con cursor
+    print("\n📊 Test 10: Probando consulta incremental con cursor...")
+    cursor = db.get_latest_probe_id()
+    assert db.get_all_services_timeline_last_24h(since_id=cursor) == {}
+    db.insert_monitoring_data(
+        service_name='bolivariano',
+        timestamp=now,
+        status='success'
+    )
+    delta = db.get_all_services_timeline_last_24h(since_id=cursor)
+    assert list(delta.keys()) == ['bolivariano'] and list(delta['bolivariano'].keys()) == [slot_for(to_epoch_ms(now))]
+    assert db.get_latest_probe_id() > cursor
+    print(f"  ✅ Desde el cursor {cursor} solo llega el segmento nuevo")
+    
+    # Test 11: Deduplicación por segmento resuelta en SQLite
+    print("\n📊 Test 11: Probando verificación más reciente por segmento...")
+    base = slot_for(to_epoch_ms(now - timedelta(hours=1)))
+    base_ms = base * 5 * 60 * 1000
+    # Verificación de 10 minutos en N, repetida dentro del mismo segmento,
+    # y una más reciente de 5 minutos en N + 1 que pisa su segundo segmento
+    db.insert_monitoring_data(service_name='dedupe_service', timestamp=base_ms,
+                              status='error', interval_minutes=10)
+    db.insert_monitoring_data(service_name='dedupe_service', timestamp=base_ms + 60000,
+                              status='success', interval_minutes=10)
+    db.insert_monitoring_data(service_name='dedupe_service', timestamp=base_ms + 360000,
+                              status='error', interval_minutes=5)
+    dedupe = db.get_service_timeline_last_24h('dedupe_service')
+    assert sorted(dedupe.keys()) == [base, base + 1]
+    assert dedupe[base]['status'] == 'success' and dedupe[base]['timestamp'] == base_ms + 60000
+    assert dedupe[base + 1]['status'] == 'error' and dedupe[base + 1]['timestamp'] == base_ms + 360000
+    assert db.get_service_data_last_24h('dedupe_service')[base]['status'] == 'success'
+    print(f"  ✅ 3 verificaciones, 2 segmentos con la más reciente de cada uno")
+    
+    # Test 12: Resúmenes por hora y por día mantenidos en cada escritura
+    print("\n📊 Test 12: Probando resúmenes de disponibilidad y latencia...")
+    hour_start = to_epoch_ms(now - timedelta(hours=2)) // 3600000 * 3600000
+    for minute, status, latency in ((0, 'success', 100), (5, 'success', 300),
+                                    (10, 'error', 200), (15, 'success', None)):
+        db.enqueue_monitoring_data(service_name='rollup_service',
+                                   timestamp=hour_start + minute * 60000,
+                                   status=status, latency_ms=latency)
+    assert db.flush_writes(timeout=5)
+    uptime = db.get_uptime('rollup_service', '7d')
+    assert uptime['resolution'] == 'hour' and len(uptime['buckets']) == 1
+    bucket = uptime['buckets'][0]
+    assert bucket['start'] == hour_start
+    assert (bucket['success_count'], bucket['failure_count']) == (3, 1)
+    assert bucket['availability'] == 75.0
+    assert (bucket['latency_min_ms'], bucket['latency_avg_ms'], bucket['latency_p95_ms']) == (100, 200, 300)
+    
+    # Reescribir una verificación recalcula su bucket; los resúmenes
+    # sobreviven a la limpieza de las verificaciones individuales
+    db.insert_monitoring_data(service_name='rollup_service', timestamp=hour_start + 600000,
+                              status='success', latency_ms=200)
+    assert db.get_uptime('rollup_service', '30d')['availability'] == 100.0
+    assert db.cleanup_old_data(hours_to_keep=0) > 0
+    assert db.get_uptime('rollup_service', '90d')['success_count'] == 4
+    assert db.get_uptime('rollup_service', '1y') is None
+    print(f"  ✅ Disponibilidad {uptime['availability']}%, p95 {uptime['latency_p95_ms']} ms")
+    
+    # Test 13: Limpieza por lotes y devolución de páginas al disco
+    print("\n🧹 Test 13: Probando limpieza incremental y auto_vacuum...")
+    for minute in range(0, 300, 5):
+        db.enqueue_monitoring_data(service_name='bulk_service',
+                                   timestamp=now - timedelta(hours=30, minutes=minute),
+                                   status='success', response_data=os.urandom(3000).hex())
+    assert db.flush_writes(timeout=5)
+    deleted_count = db.cleanup_old_data(hours_to_keep=24, batch_size=7, pause_seconds=0)
+    assert deleted_count == 60
+    reclaimed = db.reclaim_free_pages(pages_per_step=10, pause_seconds=0)
+    with db.connections.reader() as conn:
+        assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        assert conn.execute('PRAGMA freelist_count').fetchone()[0] == 0
+    assert reclaimed >= 60
+    print(f"  ✅ {deleted_count} registros en lotes de 7, {reclaimed} páginas liberadas")
+    
+    # Test 14: Estadísticas desde los contadores mantenidos por triggers
+    print("\n📊 Test 14: Probando contadores por servicio...")
+    db.insert_monitoring_data(service_name='stats_service', timestamp=now - timedelta(hours=1), status='success')
+    db.insert_monitoring_data(service_name='stats_service', timestamp=now, status='error')
+    db.insert_monitoring_data(service_name='stats_service', timestamp=now, status='success')
+    with db.connections.reader() as conn:
+        expected = {row[0]: (row[1], row[2], row[3]) for row in conn.execute('''
+            SELECT service_name, COUNT(*), MIN(timestamp), MAX(timestamp)
+            FROM monitoring_data GROUP BY service_name
+        ''')}
+    stats = db.get_database_stats()
+    assert {name: (data['total_records'], data['oldest_record'], data['newest_record'])
+            for name, data in stats['services'].items()} == expected
+    assert stats['services']['stats_service']['total_records'] == 2
+    assert stats['page_count'] > 0 and stats['freelist_count'] >= 0 and stats['wal_size_bytes'] >= 0
+    db.cleanup_old_data(hours_to_keep=0, pause_seconds=0)
+    assert db.get_database_stats()['services'] == {}
+    print(f"  ✅ Contadores iguales al GROUP BY ({stats['page_count']} páginas, WAL {stats['wal_size_bytes']} bytes)")
+    
+    # Test 15: Exportación por páginas e importación por lotes
+    print("\n📦 Test 15: Probando exportación e importación en bloque...")
+    for minute in range(0, 50, 5):
+        db.enqueue_monitoring_data(service_name='export_service', timestamp=now - timedelta(minutes=minute),
+                                   status='success' if minute % 15 else 'error',
+                                   request_data=f'{{"minute": {minute}}}', response_data='ok', latency_ms=minute)
+    db.enqueue_monitoring_data(service_name='other_service', timestamp=now, status='success')
+    assert db.flush_writes(timeout=5)
+    start_ms, end_ms = to_epoch_ms(now - timedelta(hours=1)), to_epoch_ms(now) + 1
+    exported = list(db.export_probes(start_ms, end_ms, chunk_size=3))
+    assert len(exported) == 11
+    assert [probe['timestamp'] for probe in exported] == sorted(probe['timestamp'] for probe in exported)
+    assert len(list(db.export_probes(start_ms, end_ms, 'export_service', chunk_size=4))) == 10
+    
+    import_db = MonitoringDatabase('test_monitoring_import.db')
+    lines = (json.dumps(probe) + '\n' for probe in exported)
+    assert import_db.import_ndjson(lines, chunk_size=4) == 11
+    imported = list(import_db.export_probes(start_ms, end_ms))
+    strip_id = lambda probes: [{k: v for k, v in probe.items() if k != 'id'} for probe in probes]
+    assert strip_id(imported) == strip_id(exported)
+    assert import_db.get_database_stats()['services']['export_service']['total_records'] == 10
+    import_db.close()
+    print(f"  ✅ {len(exported)} verificaciones exportadas e importadas sin cambios")
+    
+    # Test 16: Payloads guardados una vez por hash y comprimidos
+    print("\n🗜️  Test 16: Probando payloads deduplicados y comprimidos...")
+    db.cleanup_old_data(hours_to_keep=0, pause_seconds=0)
+    request_body = json.dumps({'origen': 'BOG', 'destino': 'MED'}, indent=2)
+    response_body = json.dumps({'viajes': [{'hora': f'{hour:02d}:00', 'cupos': 40} for hour in range(24)]}, indent=2)
+    for minute in range(0, 25, 5):
+        db.enqueue_monitoring_data(service_name='blob_service', timestamp=now - timedelta(minutes=minute),
+                                   status='success', request_data=request_body, response_data=response_body)
+    assert db.flush_writes(timeout=5)
+    blobs = db.get_database_stats()['payload_blobs']
+    assert blobs['count'] == 2
+    assert blobs['stored_bytes'] * 3 < blobs['raw_bytes']
+    with db.connections.reader() as conn:
+        assert [row[0] for row in conn.execute('SELECT refs FROM payload_blobs')] == [5, 5]
+    probe_id = db.get_latest_probe_id()
+    assert db.get_probe(probe_id)['response'] == response_body
+    assert db.get_service_data_last_24h('blob_service')[slot_for(to_epoch_ms(now))]['request'] == request_body
+    db.cleanup_old_data(hours_to_keep=0, pause_seconds=0)
+    assert db.get_database_stats()['payload_blobs']['count'] == 0
+    print(f"  ✅ 10 payloads en {blobs['count']} blobs, {blobs['raw_bytes']} → {blobs['stored_bytes']} bytes")
+    
+    # Test 17: Importar verificaciones de un día ya limpiado suma a sus resúmenes
+    print("\n📊 Test 17: Probando importación anterior al corte de la limpieza...")
+    day_start = to_epoch_ms(now - timedelta(days=3)) // 3600000 * 3600000
+    for minute, latency in ((0, 120), (5, 80), (10, 100), (15, 90)):
+        db.enqueue_monitoring_data(service_name='late_service', timestamp=day_start + minute * 60000,
+                                   status='success', latency_ms=latency)
+    assert db.flush_writes(timeout=5)
+    assert db.cleanup_old_data(hours_to_keep=24, pause_seconds=0) == 4
+    late_probe = {'service_name': 'late_service', 'timestamp': day_start + 3 * 3600000,
+                  'status': 'error', 'latency_ms': 50}
+    assert db.import_probes([late_probe]) == 1
+    uptime = db.get_uptime('late_service', '30d')
+    assert (uptime['success_count'], uptime['failure_count']) == (4, 1)
+    assert uptime['latency_min_ms'] == 50
+    assert len(db.get_uptime('late_service', '7d')['buckets']) == 2
+    # Reimportar la misma verificación no la cuenta dos veces
+    db.import_probes([late_probe])
+    assert db.get_uptime('late_service', '30d')['failure_count'] == 1
+    print(f"  ✅ 4 éxitos conservados + 1 error importado ({uptime['availability']}%)")
+    
+    # Test 18: Lotes reintentados mientras la base está bloqueada
+    print("\n🔒 Test 18: Probando reintentos de la cola con la base bloqueada...")
+    written = []
+    locked_attempts = [5]
+    def locked_write(batch):
+        if locked_attempts[0] > 0:
+            locked_attempts[0] -= 1
+            raise sqlite3.OperationalError('database is locked')
+        written.extend(batch)
+    write_queue = WriteBehindQueue(locked_write, batch_size=10, flush_interval=0.5,
+                                   retry_attempts=2, retry_backoff=0.01)
+    for i in range(3):
+        write_queue.put(('locked_service', i))
+    assert write_queue.flush(timeout=5)
+    # Tres intentos fallidos: el lote queda retenido, no descartado
+    assert written == [] and write_queue.depth() == 3
+    write_queue.put(('locked_service', 3))
+    assert write_queue.flush(timeout=5)
+    assert len(written) == 4 and write_queue.dropped == 0 and write_queue.depth() == 0
+    write_queue.close()
+    
+    def always_locked(batch):
+        raise sqlite3.OperationalError('database is locked')
+    write_queue = WriteBehindQueue(always_locked, batch_size=2, flush_interval=0.5,
+                                   retry_attempts=0, max_pending_rows=3)
+    for i in range(5):
+        write_queue.put(('locked_service', i))
+    assert write_queue.flush(timeout=5)
+    assert write_queue.dropped == 2 and write_queue.depth() == 3
+    write_queue.close(timeout=5)
+    assert write_queue.dropped == 5
+    assert db.get_database_stats()['dropped_writes'] == 0
+    print(f"  ✅ Lote escrito tras 5 intentos bloqueados; {write_queue.dropped} descartados solo al superar el límite y al cerrar")
+    
     print("\n✅ Todos los tests completados exitosamente!")
     
-    # Limpiar archivo de prueba
-    import os
-    if os.path.exists('test_monitoring.db'):
-        os.remove('test_monitoring.db')
-        print("🧹 Archivo de prueba eliminado")
+    # Limpiar archivos de prueba (incluye los archivos WAL y SHM)
+    db.close()
+    for name in ('test_monitoring.db', 'test_monitoring_import.db'):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(f'{name}{suffix}'):
+                os.remove(f'{name}{suffix}')
+    print("🧹 Archivo de prueba eliminado")
 
 def show_production_stats():
     """Muestra estadísticas de la base de datos de producción"""
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el stream de eventos (Server-Sent Events)
+"""
+
+import threading
+from event_broadcaster import EventBroadcaster
+
+def test_event_broadcaster():
+    """Prueba difusión, heartbeat y reanudación con Last-Event-ID"""
+    print("🔍 Probando difusión de eventos...")
+
+    broadcaster = EventBroadcaster(history_size=3, heartbeat_seconds=0.05, start_id=10)
+
+    # Test 1: heartbeat cuando no hay eventos
+    stream = broadcaster.subscribe()
+    assert next(stream).startswith('retry:')
+    assert next(stream) == ': heartbeat\n\n'
+    print("  ✅ Heartbeat enviado sin eventos nuevos")
+
+    # Test 2: el evento publicado llega a todos los clientes conectados
+    other = broadcaster.subscribe()
+    next(other)
+    received = []
+    reader = threading.Thread(target=lambda: received.append(next(other)))
+    reader.start()
+    broadcaster.publish('probe', {'id': 11, 'status': 'success'}, 11)
+    reader.join(1)
+    assert received and received[0].startswith('id: 11\nevent: probe\n')
+    frame = next(stream)
+    while frame.startswith(':'):
+        frame = next(stream)
+    assert frame == received[0]
+    assert broadcaster.subscriber_count() == 2
+    print("  ✅ Evento difundido a 2 clientes")
+
+    # Test 3: reanudar desde Last-Event-ID con el historial en memoria
+    for event_id in (12, 13, 14):
+        broadcaster.publish('probe', {'id': event_id}, event_id)
+    resumed = broadcaster.subscribe(last_event_id=12)
+    next(resumed)
+    assert next(resumed).startswith('id: 13\n')
+    assert next(resumed).startswith('id: 14\n')
+    print("  ✅ Reanudación entrega solo los eventos posteriores")
+
+    # Test 4: si el id ya salió del historial se pide recargar
+    stale = broadcaster.subscribe(last_event_id=9)
+    next(stale)
+    assert next(stale).startswith('event: reset')
+    print("  ✅ Evento reset para ids fuera del historial")
+
+    # Test 5: un id mayor al último publicado (base recreada) también pide recargar
+    ahead = broadcaster.subscribe(last_event_id=500)
+    next(ahead)
+    assert next(ahead) == 'event: reset\ndata: {"cursor": 14}\n\n'
+    broadcaster.publish('probe', {'id': 15}, 15)
+    frame = next(ahead)
+    while frame.startswith(':'):
+        frame = next(ahead)
+    assert frame.startswith('id: 15\n')
+    print("  ✅ Evento reset para ids posteriores al último y entrega de los nuevos")
+
+if __name__ == '__main__':
+    print("🔧 PRUEBA DE STREAM DE EVENTOS")
+    print("=" * 40)
+    test_event_broadcaster()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la política de evidencia de las verificaciones
+"""
+
+import json
+from services.brasilia import BrasiliaService
+from services.evidence import EvidencePolicy, truncate_text
+from services.token_cache import TokenCache
+
+def brasilia_trips(count: int):
+    """Respuesta de getViajes con `count` viajes de 20 líneas cada uno"""
+    return [{
+        'codigoOrigen': 'BOG', 'nombreOrigen': 'BOGOTA',
+        'codigoDestino': 'MDE', 'nombreDestino': 'MEDELLIN',
+        'fechaViaje': f'01-01-2025 {i % 24:02d}:00', 'isConexion': False,
+        'lineas': [{'codigo': j, 'servicio': 'PLATINO', 'sillas': 40} for j in range(20)]
+    } for i in range(count)]
+
+class FakeResponse:
+    def __init__(self, body):
+        self.status_code = 200
+        self.text = json.dumps(body)
+
+    def json(self):
+        return json.loads(self.text)
+
+class FakeSession:
+    def __init__(self, body):
+        self.body = body
+
+    def post(self, url, **kwargs):
+        return FakeResponse(self.body)
+
+def test_evidence():
+    """Prueba resumen de listas, recorte de textos y presupuesto de bytes"""
+    print("🔍 Probando política de evidencia...")
+
+    # Test 1: Listas resumidas conservando la estructura
+    print("\n📝 Test 1: Resumen de listas anidadas...")
+    policy = EvidencePolicy(max_bytes=100000, max_items=2, max_string_chars=1000)
+    summary = policy.summarize(brasilia_trips(50))
+    assert len(summary) == 3
+    assert summary[-1] == {'_omitted_items': 48, '_total_items': 50}
+    assert summary[0]['nombreDestino'] == 'MEDELLIN'
+    assert summary[0]['lineas'][-1] == {'_omitted_items': 18, '_total_items': 20}
+    assert policy.summarize([1, 2]) == [1, 2]
+    print("  ✅ 2 de 50 viajes y 2 de 20 líneas, con conteos")
+
+    # Test 2: Textos recortados dejando inicio y final
+    print("\n📝 Test 2: Recorte de textos...")
+    text = 'inicio-' + 'x' * 10000 + '-final'
+    truncated = truncate_text(text, 200)
+    assert len(truncated) <= 200
+    assert truncated.startswith('inicio-') and truncated.endswith('-final')
+    assert '10013 caracteres' in truncated
+    assert truncate_text('corto', 200) == 'corto'
+    print(f"  ✅ {len(text)} caracteres recortados a {len(truncated)}")
+
+    # Test 3: Presupuesto de bytes, primero con menos elementos y JSON válido
+    print("\n📝 Test 3: Presupuesto de bytes...")
+    policy = EvidencePolicy(max_bytes=2000, max_items=8, max_string_chars=1000)
+    rendered = policy.render(brasilia_trips(1000))
+    assert len(rendered) <= 2000
+    parsed = json.loads(rendered)
+    assert parsed[-1]['_total_items'] == 1000
+    assert len(policy.render('y' * 5000)) <= 2000
+    tiny = EvidencePolicy(max_bytes=300, max_items=3, max_string_chars=1000).render(brasilia_trips(10))
+    assert len(tiny) <= 300
+    print(f"  ✅ 1000 viajes en {len(rendered)} bytes de JSON válido")
+
+    # Test 4: La verificación guarda la evidencia resumida
+    print("\n📝 Test 4: Verificación de Brasilia con respuesta grande...")
+    service = BrasiliaService()
+    # Caché propia: la compartida de la familia Brasilia no debe quedar con este token
+    service.token_cache = TokenCache()
+    service.token_cache.store('token-prueba')
+    service.session = FakeSession(brasilia_trips(2000))
+    result = service.check_service()
+    assert result['status'] == 'success', result.get('error')
+    assert len(result['response']) <= service.evidence.max_bytes
+    trips = json.loads(result['response'])
+    assert trips[0]['codigoOrigen'] == 'BOG' and trips[-1]['_total_items'] == 2000
+    print(f"  ✅ {len(FakeResponse(brasilia_trips(2000)).text)} bytes de respuesta → {len(result['response'])} de evidencia")
+
+    print("\n✅ Todos los tests completados exitosamente!")
+
+if __name__ == '__main__':
+    test_evidence()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el archivo frío de verificaciones
+"""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from database import MonitoringDatabase, to_epoch_ms
+from probe_archive import ProbeArchive
+
+def test_probe_archive():
+    """Prueba que la limpieza archiva antes de borrar y que el archivo se puede leer por rango"""
+    print("🔍 Probando archivo frío de verificaciones...")
+
+    directory = tempfile.mkdtemp()
+    try:
+        db = MonitoringDatabase(os.path.join(directory, 'test_archive.db'))
+        archive = ProbeArchive(os.path.join(directory, 'archive'))
+        old = datetime.now() - timedelta(hours=30)
+
+        # Test 1: la limpieza copia las verificaciones antes de borrarlas
+        for minute in range(0, 90, 5):
+            for service_name in ('bolivariano', 'brasilia'):
+                db.enqueue_monitoring_data(service_name=service_name,
+                                           timestamp=old + timedelta(minutes=minute),
+                                           status='success', request_data='{"q": 1}',
+                                           response_data=f'{{"minute": {minute}}}', latency_ms=120)
+        db.insert_monitoring_data(service_name='bolivariano', timestamp=datetime.now(), status='success')
+        db.flush_writes(timeout=5)
+        deleted = db.cleanup_old_data(hours_to_keep=24, archive=archive)
+        assert deleted == 36
+        assert db.get_database_stats()['total_records'] == 1
+        print(f"  ✅ {deleted} verificaciones archivadas y eliminadas")
+
+        # Test 2: leer un servicio y rango devuelve solo lo pedido, con payloads
+        start_ms = to_epoch_ms(old + timedelta(minutes=10))
+        end_ms = to_epoch_ms(old + timedelta(minutes=40))
+        probes = list(archive.read('brasilia', start_ms, end_ms))
+        assert [probe['response'] for probe in probes] == [f'{{"minute": {m}}}' for m in range(10, 40, 5)]
+        assert all(probe['service_name'] == 'brasilia' and probe['latency_ms'] == 120 for probe in probes)
+        print(f"  ✅ Rango de 30 minutos: {len(probes)} verificaciones")
+
+        # Test 3: cada archivo del día es un gzip NDJSON válido completo
+        total = 0
+        for name in os.listdir(archive.directory):
+            if name.endswith('.ndjson.gz'):
+                with gzip.open(os.path.join(archive.directory, name), 'rt') as day_file:
+                    total += sum(1 for line in day_file if json.loads(line))
+        assert total == 36
+        print(f"  ✅ Archivos diarios legibles con gzip ({archive.stats()['size_bytes']} bytes)")
+
+        db.close()
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    print("🔧 PRUEBA DE ARCHIVO FRÍO")
+    print("=" * 40)
+    test_probe_archive()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el ejecutor concurrente de verificaciones
+"""
+
+import threading
+import time
+from probe_executor import ProbeExecutor
+
+def test_probe_executor():
+    """Prueba paralelismo, duplicados y vencimiento de plazo"""
+    print("🔍 Probando ejecutor de verificaciones...")
+
+    executor = ProbeExecutor(max_workers=4, deadline_seconds=0.3)
+    results = {}
+    timeouts = {}
+    release = threading.Event()
+
+    def slow_probe():
+        release.wait(2)
+        return 'slow'
+
+    # Test 1: un servicio lento no bloquea a los demás
+    print("\n📝 Test 1: Servicio lento no retrasa a los demás...")
+    assert executor.submit('lento', slow_probe,
+                           lambda r: results.__setitem__('lento', r),
+                           lambda elapsed: timeouts.__setitem__('lento', elapsed))
+    assert executor.submit('rapido', lambda: 'fast', lambda r: results.__setitem__('rapido', r))
+    time.sleep(0.1)
+    assert results.get('rapido') == 'fast'
+    print("  ✅ Servicio rápido completado mientras el lento sigue en curso")
+
+    # Test 2: no se programa una segunda verificación del mismo servicio
+    print("\n📝 Test 2: Evitar verificaciones duplicadas en curso...")
+    assert not executor.submit('lento', slow_probe, lambda r: None)
+    print("  ✅ Verificación duplicada rechazada")
+
+    # Test 3: el plazo vencido se reporta y el resultado tardío se descarta
+    print("\n📝 Test 3: Vencimiento de plazo...")
+    time.sleep(0.3)
+    executor.reap_expired()
+    assert 'lento' in timeouts
+    assert 'lento' not in executor.in_flight()
+    # Se reporta una sola vez
+    first_elapsed = timeouts['lento']
+    executor.reap_expired()
+    assert timeouts['lento'] == first_elapsed
+    # El hilo colgado sigue ocupando su worker: no se programa otra verificación
+    assert not executor.submit('lento', slow_probe, lambda r: None)
+    release.set()
+    time.sleep(0.1)
+    assert 'lento' not in results
+    assert executor.submit('lento', lambda: 'again', lambda r: results.__setitem__('lento', r))
+    time.sleep(0.1)
+    assert results.get('lento') == 'again'
+    print(f"  ✅ Plazo vencido tras {timeouts['lento']:.2f}s, resultado tardío descartado, sin reenvío hasta que termina")
+
+    # Test 4: el tiempo en cola no cuenta para el plazo
+    print("\n📝 Test 4: Espera en cola fuera del plazo...")
+    queued = ProbeExecutor(max_workers=1, deadline_seconds=0.3)
+    busy = threading.Event()
+    queued_timeouts = {}
+    queued_results = {}
+    assert queued.submit('ocupado', lambda: busy.wait(2), lambda r: None)
+    assert queued.submit('encolado', lambda: 'ok', lambda r: queued_results.__setitem__('encolado', r),
+                         lambda elapsed: queued_timeouts.__setitem__('encolado', elapsed))
+    time.sleep(0.4)
+    queued.reap_expired()
+    assert 'encolado' not in queued_timeouts
+    assert queued.in_flight()['encolado'] == 0.0
+    busy.set()
+    time.sleep(0.1)
+    assert queued_results.get('encolado') == 'ok'
+    queued.shutdown()
+    print("  ✅ La verificación encolada no vence antes de ejecutarse")
+
+    executor.shutdown()
+    print("\n✅ Todos los tests completados exitosamente!")
+
+if __name__ == '__main__':
+    print("🔧 PRUEBA DE EJECUTOR DE VERIFICACIONES")
+    print("=" * 40)
+    test_probe_executor()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la línea de tiempo en memoria
+"""
+
+import os
+from datetime import datetime, timedelta
+from database import MonitoringDatabase, slot_for, to_epoch_ms
+from timeline_buffer import TimelineBuffer, TimelineRing
+
+def test_timeline_buffer():
+    """Prueba que la línea de tiempo en memoria coincide con la de SQLite"""
+    print("🔍 Probando línea de tiempo en memoria...")
+
+    db = MonitoringDatabase('test_timeline.db')
+    buffer = TimelineBuffer()
+    db.add_write_listener(buffer.apply)
+    now = datetime.now()
+
+    # Test 1: carga inicial desde la base de datos
+    db.insert_monitoring_data(service_name='bolivariano', timestamp=now - timedelta(minutes=20),
+                              status='success')
+    db.insert_monitoring_data(service_name='brasilia', timestamp=now - timedelta(minutes=20),
+                              status='error', interval_minutes=10)
+    loaded = TimelineBuffer()
+    loaded.load(db.get_all_services_timeline_last_24h(), db.get_latest_probe_id())
+    assert loaded.get_all() == db.get_all_services_timeline_last_24h()
+    assert loaded.latest_id() == db.get_latest_probe_id()
+    print("  ✅ Carga inicial igual a la consulta de SQLite")
+
+    # Test 2: las escrituras nuevas llegan por el listener
+    cursor = buffer.latest_id()
+    db.insert_monitoring_data(service_name='bolivariano', timestamp=now, status='error')
+    assert buffer.get_all() == db.get_all_services_timeline_last_24h()
+    delta = buffer.get_all(since_id=cursor)
+    assert list(delta) == ['bolivariano'] and list(delta['bolivariano']) == [slot_for(to_epoch_ms(now))]
+    assert buffer.get_all('brasilia') == {'brasilia': db.get_service_timeline_last_24h('brasilia')}
+    print("  ✅ Escritura aplicada y consulta incremental por cursor")
+
+    # Test 3: los datos fuera de la ventana de 24 horas no se devuelven
+    old = now - timedelta(hours=30)
+    db.insert_monitoring_data(service_name='old_service', timestamp=old, status='success')
+    assert 'old_service' not in buffer.get_all()
+    print("  ✅ Segmentos de más de 24 horas descartados")
+
+    # Test 4: tamaño fijo, un segmento nuevo reemplaza al de un ciclo antes
+    ring = TimelineRing(capacity=4)
+    ring.put(1, 1, 1000, 'success')
+    ring.put(5, 2, 2000, 'error')
+    ring.put(1, 3, 3000, 'success')
+    ring.put(5, 4, 1500, 'success')
+    assert ring.items(0) == {5: {'id': 2, 'timestamp': 2000, 'status': 'error'}}
+    assert len(ring.ids) == 4
+    print("  ✅ Memoria constante y gana la verificación más reciente")
+
+    db.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(f'test_timeline.db{suffix}'):
+            os.remove(f'test_timeline.db{suffix}')
+
+if __name__ == '__main__':
+    print("🔧 PRUEBA DE LÍNEA DE TIEMPO EN MEMORIA")
+    print("=" * 40)
+    test_timeline_buffer()
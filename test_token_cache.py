@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la caché de tokens de los servicios
+"""
+
+import base64
+import json
+import threading
+import time
+from services.token_cache import TokenCache, jwt_expiry, shared_token_cache
+from services.brasilia import BrasiliaService
+from services.arauca_brasilia import AraucaBrasiliaService
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.text = body if isinstance(body, str) else json.dumps(body)
+        self.headers = {}
+
+    def json(self):
+        return json.loads(self.text)
+
+class FakeSession:
+    """Sesión simulada que responde según la URL solicitada"""
+    def __init__(self, trips_statuses):
+        self.trips_statuses = list(trips_statuses)
+        self.calls = []
+        self.trip_headers = []
+
+    def post(self, url, **kwargs):
+        self.calls.append(url)
+        if url.endswith('/login/authenticate'):
+            return FakeResponse(200, {'token': f'token-{len(self.calls)}'})
+        self.trip_headers.append(kwargs.get('headers', {}))
+        status = self.trips_statuses.pop(0)
+        return FakeResponse(status, [] if status == 200 else 'Unauthorized')
+
+class SharedLoginSession:
+    """Sesión simulada de un host de la familia Brasilia; registra los logins"""
+    def __init__(self, logins):
+        self.logins = logins
+        self.trip_headers = []
+
+    def post(self, url, **kwargs):
+        if url.endswith('/login/authenticate'):
+            self.logins.append(url)
+            time.sleep(0.05)
+            response = FakeResponse(200, {'token': f'token-{len(self.logins)}'})
+            response.headers = {'Set-Cookie': 'JSESSIONID=sesion-1; Path=/; HttpOnly'}
+            return response
+        self.trip_headers.append(kwargs.get('headers', {}))
+        return FakeResponse(200, [])
+
+def make_jwt(exp):
+    payload = base64.urlsafe_b64encode(json.dumps({'exp': exp}).encode()).decode().rstrip('=')
+    return f'eyJhbGciOiJIUzI1NiJ9.{payload}.firma'
+
+def test_token_cache():
+    """Prueba vencimiento por JWT, TTL y renovación anticipada"""
+    print("🔍 Probando caché de tokens...")
+
+    exp = int(time.time()) + 3600
+    assert jwt_expiry(make_jwt(exp)) == exp
+    assert jwt_expiry('token-plano') is None
+    print("  ✅ Claim exp leído desde JWT")
+
+    cache = TokenCache(ttl_seconds=120, refresh_margin_seconds=60)
+    cache.store('token-plano')
+    assert cache.get() == 'token-plano'
+    cache.store(make_jwt(int(time.time()) + 30))
+    assert cache.get() is None
+    print("  ✅ TTL aplicado y renovación anticipada antes del vencimiento")
+
+def test_service_token_reuse_and_401_retry():
+    """Prueba que el token se reutiliza y se renueva una vez ante un 401"""
+    print("🔍 Probando reutilización de token en servicio...")
+
+    service = BrasiliaService()
+    # Caché propia: el conteo de logins no depende de la caché compartida de la familia
+    service.token_cache = TokenCache()
+    service.session = FakeSession([200, 200, 401, 200])
+
+    assert service.check_service()['status'] == 'success'
+    assert service.check_service()['status'] == 'success'
+    logins = [url for url in service.session.calls if url.endswith('/login/authenticate')]
+    assert len(logins) == 1
+    print("  ✅ Un solo login para dos verificaciones")
+
+    result = service.check_service()
+    assert result['status'] == 'success'
+    assert result['login']['status'] == 'success'
+    logins = [url for url in service.session.calls if url.endswith('/login/authenticate')]
+    assert len(logins) == 2
+    print("  ✅ Token invalidado y login repetido tras HTTP 401")
+
+def test_brasilia_session_cookie():
+    """Prueba que Brasilia reenvía JSESSIONID solo si el login lo entregó"""
+    print("🔍 Probando cookie de sesión de Brasilia...")
+
+    service = BrasiliaService()
+    service.token_cache = TokenCache()
+    service.session = SharedLoginSession([])
+    assert service.check_service()['status'] == 'success'
+    assert service.session.trip_headers[-1]['Cookie'] == 'JSESSIONID=sesion-1'
+    print("  ✅ Cookie JSESSIONID del login reenviada en la consulta de viajes")
+
+    # Un login sin Set-Cookie no reenvía la cookie del login anterior
+    service.token_cache.invalidate()
+    service.session = FakeSession([200])
+    assert service.check_service()['status'] == 'success'
+    assert 'Cookie' not in service.session.trip_headers[-1]
+    print("  ✅ Sin cookie en el login, la consulta va sin Cookie")
+
+def test_shared_login_across_family():
+    """Prueba que Brasilia y Arauca comparten token y cookie con un solo login"""
+    print("🔍 Probando login compartido de la familia Brasilia...")
+
+    assert BrasiliaService().token_cache is AraucaBrasiliaService().token_cache
+    print("  ✅ Misma caché para las mismas credenciales y backend")
+
+    cache = shared_token_cache(('prueba-familia', 'usuario', 'clave'))
+    logins = []
+    family = [BrasiliaService(), AraucaBrasiliaService(), AraucaBrasiliaService()]
+    for service in family:
+        service.token_cache = cache
+        service.session = SharedLoginSession(logins)
+
+    threads = [threading.Thread(target=service.check_trips_api) for service in family]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(logins) == 1
+    assert cache.health()['logins'] == 1
+    for service in family:
+        headers = service.session.trip_headers[-1]
+        assert headers['Authorization'] == 'Bearer token-1'
+        assert headers['Cookie'] == 'JSESSIONID=sesion-1'
+    print("  ✅ Un login para tres verificaciones concurrentes, con token y cookie compartidos")
+
+    # Un 401 con un token ya reemplazado no descarta el nuevo
+    cache.invalidate('token-viejo')
+    assert cache.get() == 'token-1'
+    cache.invalidate('token-1')
+    assert cache.get() is None and cache.cookies() == {}
+    print("  ✅ Invalidación solo del token rechazado")
+
+if __name__ == '__main__':
+    print("🔧 PRUEBA DE CACHÉ DE TOKENS")
+    print("=" * 40)
+    test_token_cache()
+    test_service_token_reuse_and_401_retry()
+    test_brasilia_session_cookie()
+    test_shared_login_across_family()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la lectura por bloques de la respuesta SOAP de viajes
+"""
+
+from xml.sax.saxutils import escape
+from services.transpurificacion import TranspurificacionService
+from services.xml_stream import InnerXMLError, TripStreamParser
+
+REQUIRED = ['TerminalOrigenNombre', 'TerminalDestinoNombre', 'FechaPartida', 'ButacasDisponibles']
+
+def soap_response(inner_xml: str) -> bytes:
+    """Sobre SOAP con el XML interno escapado, como lo entrega el servicio"""
+    return f'''<?xml version="1.0" encoding="utf-8"?>
+<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope">
+  <soap:Body>
+    <GetDisponiblesIdaResponse xmlns="http://agilis.fics.fsl.sisorg.com.ar/">
+      <GetDisponiblesIdaResult>{escape(inner_xml)}</GetDisponiblesIdaResult>
+    </GetDisponiblesIdaResponse>
+  </soap:Body>
+</soap:Envelope>'''.encode('utf-8')
+
+def trips_xml(count: int, attrs: str = None) -> str:
+    attrs = attrs or ('TerminalOrigenNombre="Bogotá" TerminalDestinoNombre="Purificación" '
+                      'FechaPartida="01/01/2025 {hour:02d}:00" ButacasDisponibles="12"')
+    viajes = ''.join(f'<viaje {attrs.format(hour=i % 24)} />' for i in range(count))
+    return f'<viajes>{viajes}</viajes>'
+
+def parse(body: bytes, chunk_size: int = 7, max_evidence_bytes: int = 256) -> TripStreamParser:
+    parser = TripStreamParser('GetDisponiblesIdaResult', REQUIRED, max_evidence_bytes)
+    for start in range(0, len(body), chunk_size):
+        if not parser.feed(body[start:start + chunk_size]):
+            return parser
+    parser.close()
+    return parser
+
+class FakeResponse:
+    def __init__(self, body: bytes):
+        self.status_code = 200
+        self.encoding = 'utf-8'
+        self.body = body
+        self.read_bytes = 0
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            self.read_bytes += chunk_size
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+class FakeSession:
+    def __init__(self, body: bytes):
+        self.response = FakeResponse(body)
+
+    def post(self, url, **kwargs):
+        assert kwargs.get('stream') is True
+        return self.response
+
+def test_xml_stream():
+    """Prueba conteo, validación del primer viaje, corte anticipado y evidencia acotada"""
+    print("🔍 Probando lectura por bloques del XML de viajes...")
+
+    # Test 1: Conteo con bloques que cortan etiquetas y entidades escapadas
+    print("\n📝 Test 1: Contando viajes por bloques...")
+    body = soap_response(trips_xml(500))
+    parser = parse(body)
+    assert parser.has_result and parser.missing_attrs is None
+    assert parser.total_viajes == 500
+    assert parser.first_viaje['TerminalDestinoNombre'] == 'Purificación'
+    assert len(parser.evidence) == 256 and parser.truncated
+    assert parser.total_bytes == len(body)
+    print(f"  ✅ {parser.total_viajes} viajes en {len(body)} bytes, {len(parser.evidence)} bytes de evidencia")
+
+    # Test 2: Sin viajes y sin resultado
+    print("\n📝 Test 2: Respuesta sin viajes y sin resultado...")
+    parser = parse(soap_response('<viajes />'))
+    assert parser.has_result and parser.total_viajes == 0
+    parser = parse(soap_response('').replace(b'<GetDisponiblesIdaResult></GetDisponiblesIdaResult>', b''))
+    assert not parser.has_result
+    print("  ✅ Sin viajes es válido; sin GetDisponiblesIdaResult se detecta")
+
+    # Test 3: El primer viaje incompleto corta la lectura
+    print("\n📝 Test 3: Corte anticipado con atributos faltantes...")
+    body = soap_response(trips_xml(2000, attrs='TerminalOrigenNombre="Bogotá" FechaPartida="x"'))
+    parser = parse(body, chunk_size=512)
+    assert parser.missing_attrs == ['TerminalDestinoNombre', 'ButacasDisponibles']
+    assert parser.total_bytes < len(body) // 10
+    print(f"  ✅ Lectura detenida tras {parser.total_bytes} de {len(body)} bytes")
+
+    # Test 4: XML interno inválido
+    print("\n📝 Test 4: XML interno inválido...")
+    try:
+        parse(soap_response(trips_xml(3).replace('</viajes>', '</viaje>')))
+        assert False, 'se esperaba InnerXMLError'
+    except InnerXMLError:
+        pass
+    print("  ✅ Error de XML interno detectado")
+
+    # Test 5: Resultado de la verificación completa
+    print("\n📝 Test 5: Verificación de Transpurificación por bloques...")
+    service = TranspurificacionService()
+    service.token_cache.store('token-prueba')
+    body = soap_response(trips_xml(3000))
+    service.session = FakeSession(body)
+    result = service.check_trips_api()
+    assert result['success'], result.get('error')
+    response = result['response']
+    assert response['parsed_data']['total_viajes'] == 3000
+    assert response['xml_response_bytes'] == len(body) and response['xml_truncated']
+    assert len(response['xml_response'].encode('utf-8')) <= service.evidence.max_string_chars
+
+    service.session = FakeSession(soap_response(trips_xml(3000, attrs='FechaPartida="x"')))
+    result = service.check_trips_api()
+    assert not result['success'] and 'Missing required attributes' in result['error']
+    assert service.session.response.read_bytes < len(service.session.response.body)
+    print(f"  ✅ {response['parsed_data']['total_viajes']} viajes, evidencia de {len(response['xml_response'])} caracteres")
+
+    print("\n✅ Todos los tests completados exitosamente!")
+
+if __name__ == '__main__':
+    test_xml_stream()
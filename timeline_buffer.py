@@ -0,0 +1,117 @@
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, Optional
+
+from database import SLOT_MINUTES, expand_slots
+
+# Segmentos de la ventana de 24 horas más una hora de margen: una
+# verificación de intervalo largo cubre segmentos posteriores al actual
+RING_SLOTS = 24 * 60 // SLOT_MINUTES + 60 // SLOT_MINUTES
+
+# Estados conocidos; el código 0 marca una posición vacía
+STATUSES = ('success', 'error', 'unknown')
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES, start=1)}
+
+class TimelineRing:
+    """Línea de tiempo de un servicio en arreglos de tamaño fijo.
+
+    La posición de cada segmento es `slot % capacity`, así que escribir un
+    segmento nuevo reemplaza al que ocupaba esa posición un ciclo antes y la
+    memoria no crece con el tiempo.
+    """
+
+    def __init__(self, capacity: int = RING_SLOTS):
+        self.capacity = capacity
+        self.slots = array('q', [-1]) * capacity
+        self.timestamps = array('q', [0]) * capacity
+        self.ids = array('q', [0]) * capacity
+        self.statuses = array('b', [0]) * capacity
+
+    def put(self, slot: int, probe_id: int, timestamp: int, status: str):
+        """Guarda la verificación en el segmento si es la más reciente"""
+        index = slot % self.capacity
+        current = self.slots[index]
+        if current > slot or (current == slot and self.timestamps[index] > timestamp):
+            return
+        self.slots[index] = slot
+        self.timestamps[index] = timestamp
+        self.ids[index] = probe_id
+        self.statuses[index] = STATUS_CODES.get(status, STATUS_CODES['unknown'])
+
+    def items(self, cutoff_ms: int, since_id: Optional[int] = None,
+              until_id: Optional[int] = None) -> Dict[int, Dict]:
+        """Segmentos con verificaciones desde `cutoff_ms`, en el formato de la API"""
+        result = {}
+        for index in range(self.capacity):
+            probe_id = self.ids[index]
+            if (not self.statuses[index] or self.timestamps[index] < cutoff_ms or
+                    (since_id is not None and probe_id <= since_id) or
+                    (until_id is not None and probe_id > until_id)):
+                continue
+            result[self.slots[index]] = {
+                'id': probe_id,
+                'timestamp': self.timestamps[index],
+                'status': STATUSES[self.statuses[index] - 1]
+            }
+        return result
+
+class TimelineBuffer:
+    """Líneas de tiempo de las últimas 24 horas en memoria, por servicio.
+
+    Se carga desde la base de datos al arrancar y se actualiza como listener
+    de escritura de `MonitoringDatabase`, de modo que las consultas de la
+    línea de tiempo no tocan el disco. SQLite sigue siendo el registro
+    durable.
+    """
+
+    def __init__(self, capacity: int = RING_SLOTS):
+        self.capacity = capacity
+        self._rings: Dict[str, TimelineRing] = {}
+        self._lock = threading.Lock()
+        self._latest_id = 0
+
+    def load(self, timelines: Dict[str, Dict], latest_id: int):
+        """Carga el resultado de `get_all_services_timeline_last_24h`"""
+        with self._lock:
+            for service_name, slots in timelines.items():
+                ring = self._ring(service_name)
+                for slot, data in slots.items():
+                    ring.put(slot, data['id'], data['timestamp'], data['status'])
+            self._latest_id = max(self._latest_id, latest_id)
+
+    def apply(self, probes: Iterable[Dict]):
+        """Aplica verificaciones recién confirmadas (listener de escritura)"""
+        with self._lock:
+            for probe in probes:
+                ring = self._ring(probe['service_name'])
+                for slot in expand_slots(probe['slot'], probe['interval_minutes']):
+                    ring.put(slot, probe['id'], probe['timestamp'], probe['status'])
+                self._latest_id = max(self._latest_id, probe['id'])
+
+    def latest_id(self) -> int:
+        """Id de la última verificación aplicada; sirve como cursor incremental"""
+        with self._lock:
+            return self._latest_id
+
+    def get_all(self, service_name: Optional[str] = None, since_id: Optional[int] = None,
+                until_id: Optional[int] = None) -> Dict[str, Dict]:
+        """Misma respuesta que `get_all_services_timeline_last_24h`, sin consultar SQLite"""
+        cutoff_ms = int(time.time() * 1000) - 24 * 60 * 60 * 1000
+        with self._lock:
+            names = list(self._rings) if service_name is None else [service_name]
+            result = {}
+            for name in names:
+                ring = self._rings.get(name)
+                if ring is None:
+                    continue
+                slots = ring.items(cutoff_ms, since_id, until_id)
+                if slots:
+                    result[name] = slots
+            return result
+
+    def _ring(self, service_name: str) -> TimelineRing:
+        ring = self._rings.get(service_name)
+        if ring is None:
+            ring = self._rings[service_name] = TimelineRing(self.capacity)
+        return ring